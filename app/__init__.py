@@ -1,7 +1,8 @@
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
-from app.db.database import get_session
+from app.db.database import get_session, get_read_session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+# Ограниченный по размеру LRU-кэш с временем жизни записей (в пределах одного процесса)
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        # Поколения сброса: номер последнего invalidate по ключу (ограничено maxsize) и нижняя граница
+        # для вытесненных номеров. Запись, прочитанная до сброса, не попадёт в кэш после него
+        self._clock = 0
+        self._invalidated: OrderedDict = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Получение значения по ключу (None, если записи нет или она устарела)
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Текущее поколение кэша: берётся до чтения из источника и передаётся в set
+    def generation(self) -> int:
+        return self._clock
+
+    # Сохранение значения (ttl можно переопределить для отдельной записи). Если передано поколение,
+    # а ключ сбрасывался после него, значение устарело и не сохраняется
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        if generation is not None and (generation < self._floor or self._invalidated.get(key, 0) > generation):
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    # Удаление записи по ключу
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+        self._clock += 1
+        self._invalidated[key] = self._clock
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > max(self.maxsize, 1):
+            _, dropped = self._invalidated.popitem(last=False)
+            self._floor = dropped
+
+    # Полная очистка кэша (все ранее взятые поколения становятся устаревшими)
+    def clear(self) -> None:
+        self._data.clear()
+        self._invalidated.clear()
+        self._clock += 1
+        self._floor = self._clock
+
+    # Счётчики для мониторинга эффективности кэша
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total > 0 else 0
+        }
+
+
+# Проверка If-None-Match: слабое сравнение ETag (RFC 9110), поддерживается "*" и список значений
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    return any(opaque(tag) == opaque(etag) for tag in if_none_match.split(","))
@@ -0,0 +1,231 @@
+import asyncio
+import codecs
+import csv
+import time
+from typing import AsyncIterator, Callable, Optional, Type
+
+import orjson
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db.write_queue import write_queue
+from config import settings
+
+# Массовый импорт записей из потока NDJSON или CSV. Строки читаются из тела запроса по мере поступления,
+# проверяются схемой pydantic и записываются пачками (executemany) через очередь записи.
+# Ошибки отдельных строк попадают в отчёт и не прерывают импорт
+
+# Исключение при строке длиннее IMPORT_MAX_LINE_BYTES (дальнейшее чтение потока невозможно)
+class LineTooLongError(Exception):
+    def __init__(self, line_no: int):
+        super().__init__(line_no)
+        self.line_no = line_no
+
+
+# Формат по параметру запроса или Content-Type (по умолчанию NDJSON)
+def detect_format(fmt: Optional[str], content_type: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if content_type and "csv" in content_type.lower():
+        return "csv"
+    return "ndjson"
+
+
+# Разбиение потока байтов на строки; возвращает пары (номер строки, байты без перевода строки)
+async def read_lines(stream: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[tuple]:
+    buffer = bytearray()
+    line_no = 0
+
+    async for chunk in stream:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            line_no += 1
+            if end - start > max_line_bytes:
+                raise LineTooLongError(line_no)
+            yield line_no, bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+        del buffer[:start]
+
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(line_no + 1)
+
+    if buffer:
+        yield line_no + 1, bytes(buffer).rstrip(b"\r")
+
+
+# Записи NDJSON: тройки (номер строки, словарь или None, ошибка или None)
+async def ndjson_records(lines: AsyncIterator[tuple]) -> AsyncIterator[tuple]:
+    async for line_no, line in lines:
+        if line_no == 1 and line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8):]
+        if not line.strip():
+            continue
+
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_no, None, f"Некорректный JSON: {e}"
+            continue
+
+        if not isinstance(record, dict):
+            yield line_no, None, "Строка должна содержать JSON-объект"
+            continue
+        yield line_no, record, None
+
+
+# Записи CSV (первая строка - заголовок с именами полей). Поле в кавычках может занимать несколько
+# строк: запись собирается, пока число кавычек нечётное. Пустые значения считаются отсутствующими
+async def csv_records(lines: AsyncIterator[tuple], max_line_bytes: int) -> AsyncIterator[tuple]:
+    header = None
+    pending = []
+    pending_size = 0
+    start = 0
+
+    async for line_no, line in lines:
+        try:
+            text = line.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError:
+            yield line_no, None, "Строка не в кодировке UTF-8"
+            pending, pending_size = [], 0
+            continue
+
+        if not pending:
+            if not text.strip():
+                continue
+            start = line_no
+
+        pending.append(text)
+        pending_size += len(line)
+        if pending_size > max_line_bytes:
+            raise LineTooLongError(start)
+
+        record_text = "\n".join(pending)
+        if record_text.count('"') % 2:
+            continue
+        pending, pending_size = [], 0
+
+        values = next(csv.reader([record_text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        if len(values) != len(header):
+            yield start, None, f"Ожидалось полей: {len(header)}, получено: {len(values)}"
+            continue
+        yield start, {name: value for name, value in zip(header, values) if value != ""}, None
+
+    if pending:
+        yield start, None, "Незакрытые кавычки в конце файла"
+
+
+# Краткое описание ошибок проверки схемы
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'запись'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+# Единица работы очереди записи: вставка пачки одним executemany в точке сохранения.
+# Если пачка не записалась (например, нарушено ограничение), строки вставляются по одной,
+# чтобы записать корректные и указать номера ошибочных. batch_context(session) - необязательный
+# асинхронный контекст вокруг вставки пачки (например, отложенное обновление поисковых индексов)
+def insert_batch_unit(model, batch: list, batch_context: Optional[Callable] = None):
+    table = model.__table__
+
+    async def insert_rows(session):
+        try:
+            async with session.begin_nested():
+                await session.execute(insert(table), [row for _, row in batch])
+            return len(batch), []
+        except SQLAlchemyError:
+            pass
+
+        inserted = 0
+        errors = []
+        for line_no, row in batch:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(table), [row])
+                inserted += 1
+            except SQLAlchemyError as e:
+                errors.append((line_no, f"Ошибка записи: {getattr(e, 'orig', None) or e}"))
+        return inserted, errors
+
+    async def unit(session):
+        if batch_context is None:
+            return await insert_rows(session)
+        async with batch_context(session):
+            return await insert_rows(session)
+
+    return unit
+
+
+# Импорт записей из потока: проверка схемой, преобразование в строку таблицы (to_row) и запись пачками.
+# Пока пачка записывается, читается следующая. Возвращает отчёт с числом строк, ошибками и скоростью
+async def import_records(
+        stream: AsyncIterator[bytes],
+        fmt: str,
+        schema: Type[BaseModel],
+        model,
+        to_row: Callable[[BaseModel], dict],
+        batch_size: Optional[int] = None,
+        batch_context: Optional[Callable] = None
+) -> dict:
+    started_at = time.perf_counter()
+    batch_size = max(1, batch_size or settings.IMPORT_BATCH_SIZE)
+    report = {"format": fmt, "total": 0, "imported": 0, "failed": 0, "errors": [], "completed": True}
+
+    def add_error(line_no: int, error: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < settings.IMPORT_MAX_ERRORS:
+            report["errors"].append({"line": line_no, "error": error})
+
+    async def collect(submission) -> None:
+        inserted, errors = await submission
+        report["imported"] += inserted
+        for line_no, error in errors:
+            add_error(line_no, error)
+
+    lines = read_lines(stream, settings.IMPORT_MAX_LINE_BYTES)
+    if fmt == "csv":
+        records = csv_records(lines, settings.IMPORT_MAX_LINE_BYTES)
+    else:
+        records = ndjson_records(lines)
+
+    batch = []
+    in_flight = None
+    try:
+        async for line_no, record, error in records:
+            report["total"] += 1
+            if error is None:
+                try:
+                    batch.append((line_no, to_row(schema.model_validate(record))))
+                except ValidationError as e:
+                    error = validation_message(e)
+            if error is not None:
+                add_error(line_no, error)
+                continue
+
+            if len(batch) >= batch_size:
+                if in_flight is not None:
+                    await collect(in_flight)
+                in_flight = asyncio.ensure_future(write_queue.submit(insert_batch_unit(model, batch, batch_context)))
+                batch = []
+    except LineTooLongError as e:
+        add_error(e.line_no, f"Строка длиннее {settings.IMPORT_MAX_LINE_BYTES} байт, импорт остановлен")
+        report["completed"] = False
+    finally:
+        if in_flight is not None:
+            await collect(in_flight)
+
+    if batch:
+        await collect(write_queue.submit(insert_batch_unit(model, batch, batch_context)))
+
+    elapsed = time.perf_counter() - started_at
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    report["duration_ms"] = round(elapsed * 1000, 2)
+    report["rows_per_second"] = round(report["imported"] / elapsed) if elapsed > 0 else 0
+    return report
@@ -1,19 +1,130 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.db.models import Base
+from app.db.migrations import pending_migrations, apply_migration
 from config import settings
 
-# Создание асинхронного движка для подключения к базе данных
-async_engine = create_async_engine(url=settings.DB_URL, echo=True)
+PRODUCTION_PROFILE = "production"
+
+
+# Параметры движка в зависимости от профиля базы данных. Проверка соединения при выдаче из пула
+# и их пересоздание нужны только серверным СУБД: у файла SQLite нет соединения, которое может устареть
+def engine_options(read_only: bool = False) -> dict:
+    production = settings.DB_PROFILE == PRODUCTION_PROFILE
+    options = {"echo": settings.DB_ECHO if settings.DB_ECHO is not None else not production}
+
+    if production:
+        options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+        if make_url(settings.DB_URL).get_backend_name() != "sqlite":
+            options.update(pool_recycle=settings.DB_POOL_RECYCLE, pool_pre_ping=True)
+        if read_only:
+            options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        else:
+            # Запись в SQLite всё равно выполняется одним писателем, поэтому пул писателя минимален
+            options.update(pool_size=settings.DB_WRITE_POOL_SIZE, max_overflow=0)
+
+    return options
+
+
+# URL только для чтения (mode=ro) для файловой базы SQLite; None для базы в памяти
+def read_only_url(url: str):
+    url = make_url(url)
+    database = url.database
+    if url.get_backend_name() != "sqlite" or not database or database == ":memory:":
+        return None
+    if database.startswith("file:"):
+        database = database[len("file:"):].split("?", 1)[0]
+
+    return url.set(
+        database=f"file:{database}",
+        query={**url.query, "mode": "ro", "uri": "true"}
+    )
+
+
+# PRAGMA, действующие на уровне соединения (общие для писателя и читателей)
+def _set_connection_pragmas(cursor):
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+    # Отрицательное значение cache_size задаётся в килобайтах
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA temp_store={settings.DB_TEMP_STORE}")
+
+
+# Установка PRAGMA для каждого нового соединения писателя (профиль production)
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    _set_connection_pragmas(cursor)
+    cursor.close()
+
+
+# Установка PRAGMA для соединений только для чтения (режим журнала задаёт писатель)
+def set_sqlite_read_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    if settings.DB_PROFILE == PRODUCTION_PROFILE:
+        _set_connection_pragmas(cursor)
+    cursor.close()
+
+
+# Управление транзакциями писателя вручную: драйвер sqlite3 сам не выдаёт BEGIN,
+# из-за чего не работают точки сохранения (SAVEPOINT)
+def disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+# Пишущая транзакция сразу захватывает блокировку записи, исключая взаимоблокировки при повышении уровня
+def begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+# Создание асинхронного движка для подключения к базе данных (запись)
+async_engine = create_async_engine(url=settings.DB_URL, **engine_options())
+
+if settings.DB_PROFILE == PRODUCTION_PROFILE:
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+event.listen(async_engine.sync_engine, "connect", disable_driver_transactions)
+event.listen(async_engine.sync_engine, "begin", begin_immediate)
+
+# Движок только для чтения с отдельным пулом соединений
+_read_url = read_only_url(settings.DB_URL)
+if _read_url is not None:
+    async_read_engine = create_async_engine(url=_read_url, **engine_options(read_only=True))
+    event.listen(async_read_engine.sync_engine, "connect", set_sqlite_read_pragmas)
+else:
+    async_read_engine = async_engine
 
 # Создание фабрики асинхронных сессий
 async_session = async_sessionmaker(bind=async_engine, expire_on_commit=False, class_=AsyncSession)
 
-# Функция создания всех таблиц в базе данных
-async def create_db():
-    async with async_engine.begin() as conn:
+# Фабрика сессий только для чтения
+async_read_session = async_sessionmaker(bind=async_read_engine, expire_on_commit=False, class_=AsyncSession)
+
+# Функция создания всех таблиц в базе данных и применения миграций
+# (create_all не добавляет новые индексы и колонки в уже существующие таблицы).
+# Каждая миграция фиксируется в своей транзакции: ошибка следующей миграции не откатывает
+# уже применённые, а изменения файлов после фиксации (миграция 5) остаются согласованными с базой
+async def create_db(engine: AsyncEngine = async_engine):
+    async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        migrations = await conn.run_sync(pending_migrations)
+
+    for migration in migrations:
+        async with engine.begin() as conn:
+            after_commit = await conn.run_sync(apply_migration, *migration)
+        if after_commit is not None:
+            await run_in_threadpool(after_commit)
 
 # Функция-зависимость для получения сессии базы данных
 async def get_session():
     async with async_session() as session:
         yield session
+
+# Функция-зависимость для получения сессии только для чтения
+async def get_read_session():
+    async with async_read_session() as session:
+        yield session
@@ -0,0 +1,54 @@
+import zlib
+from typing import AsyncIterator, Callable, Optional
+
+import orjson
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import async_read_session
+from config import settings
+
+# Потоковая выгрузка таблиц в NDJSON (одна JSON-запись на строку). Строки читаются серверным курсором
+# (stream + yield_per) пачками по EXPORT_CHUNK_ROWS, поэтому память не зависит от размера таблицы.
+# Выгрузка идёт по возрастанию id: при обрыве её можно продолжить с параметром after_id,
+# равным id последней полученной записи
+
+
+# Пачки NDJSON по результату запроса; вся выгрузка читается в одной транзакции чтения
+async def ndjson_chunks(query, to_item: Callable, chunk_rows: int) -> AsyncIterator[bytes]:
+    async with async_read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_rows))
+        async for rows in result.partitions():
+            yield b"".join(orjson.dumps(to_item(row), option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+# Сжатие потока в gzip; zlib отпускает GIL, поэтому сжатие выполняется в пуле потоков
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = await run_in_threadpool(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Ответ с потоковой выгрузкой запроса query (строки с id > after_id по возрастанию id)
+def export_response(query, id_column, to_item: Callable, name: str,
+                    after_id: Optional[int] = None, compress: bool = False) -> StreamingResponse:
+    if after_id is not None:
+        query = query.where(id_column > after_id)
+    query = query.order_by(id_column)
+
+    chunks = ndjson_chunks(query, to_item, settings.EXPORT_CHUNK_ROWS)
+    if compress:
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{name}.ndjson.gz"'}
+        )
+
+    return StreamingResponse(
+        chunks,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}.ndjson"'}
+    )
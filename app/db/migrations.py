@@ -0,0 +1,171 @@
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import Connection
+
+from app.db.models import canonical_timestamp_sql
+from app.lineevent.search import create_timeline_search_index
+from app.project.search import create_project_search_index
+from app.project.stats import create_project_stats_triggers
+from app.project.storage import deduplicate_uploads, remove_replaced_uploads
+
+logger = logging.getLogger(__name__)
+
+
+# Миграция 1: составные индексы таблицы projects и уникальные индексы users
+def _add_project_indexes(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_projects_featured_created "
+        "ON projects (status = 'FEATURED', created_at)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_projects_status_created ON projects (status, created_at)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_projects_type_status_created "
+        "ON projects (project_type, status, created_at)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_projects_user_created ON projects (user_id, created_at)"
+    )
+
+    for column in ("email", "phone_number"):
+        _make_unique_index(connection, "users", column)
+
+
+# Замена обычного индекса create_all на уникальный (с проверкой дубликатов)
+def _make_unique_index(connection: Connection, table: str, column: str) -> None:
+    index_name = f"ix_{table}_{column}"
+    indexes = {row[1]: row[2] for row in connection.exec_driver_sql(f"PRAGMA index_list({table})")}
+    if indexes.get(index_name) == 1:
+        return
+
+    duplicates = connection.exec_driver_sql(
+        f"SELECT {column}, COUNT(*) FROM {table} GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 5"
+    ).all()
+    if duplicates:
+        values = ", ".join(str(value) for value, _ in duplicates)
+        raise RuntimeError(
+            f"Невозможно создать уникальный индекс {index_name}: найдены дубликаты ({values})"
+        )
+
+    connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index_name}")
+    connection.exec_driver_sql(f"CREATE UNIQUE INDEX {index_name} ON {table} ({column})")
+
+
+# Добавление колонки в существующую таблицу, если её ещё нет
+def _add_column(connection: Connection, table: str, column: str, definition: str) -> None:
+    columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+# Миграция 4: SHA-256 содержимого файла проекта
+def _add_project_file_sha256(connection: Connection) -> None:
+    _add_column(connection, "projects", "file_sha256", "VARCHAR(64)")
+
+
+# Миграция 5: файлы переносятся в хранилище копией (жёсткой ссылкой), а исходные удаляются
+# только после фиксации миграции - иначе при откате проекты ссылались бы на удалённые файлы
+def _deduplicate_uploads(connection: Connection) -> Callable:
+    replaced = deduplicate_uploads(connection)
+    return lambda: remove_replaced_uploads(replaced)
+
+
+# Миграция 6: колонки результатов фоновой обработки файлов и задачи обработки для уже загруженных файлов
+def _add_project_processing(connection: Connection) -> None:
+    _add_column(connection, "projects", "file_mime_type", "VARCHAR(100)")
+    _add_column(connection, "projects", "file_page_count", "INTEGER")
+    _add_column(connection, "projects", "file_archive_entries", "INTEGER")
+    _add_column(connection, "projects", "file_text_excerpt", "TEXT")
+    connection.exec_driver_sql(
+        "INSERT INTO processing_jobs (project_id, status, attempts, created_at) "
+        "SELECT id, 'PENDING', 0, CURRENT_TIMESTAMP FROM projects "
+        "WHERE file_path IS NOT NULL "
+        "AND id NOT IN (SELECT project_id FROM processing_jobs)"
+    )
+
+
+# Миграция 7: timeline_events.year из VARCHAR(10) в INTEGER. SQLite не меняет тип колонки,
+# поэтому таблица пересоздаётся с переносом данных; значения, не являющиеся целым числом, останавливают миграцию
+def _convert_timeline_year(connection: Connection) -> None:
+    columns = {row[1]: row[2] for row in connection.exec_driver_sql("PRAGMA table_info(timeline_events)")}
+    if columns.get("year", "").upper() != "INTEGER":
+        invalid = connection.exec_driver_sql(
+            "SELECT id, year FROM timeline_events "
+            "WHERE CAST(CAST(trim(year) AS INTEGER) AS TEXT) != trim(year) LIMIT 5"
+        ).all()
+        if invalid:
+            values = ", ".join(f"id={event_id}: {year!r}" for event_id, year in invalid)
+            raise RuntimeError(f"Невозможно преобразовать год события в число ({values})")
+
+        connection.exec_driver_sql(
+            "CREATE TABLE timeline_events_new ("
+            "id INTEGER NOT NULL PRIMARY KEY, "
+            "year INTEGER NOT NULL, "
+            "title VARCHAR(200) NOT NULL, "
+            "description TEXT NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO timeline_events_new (id, year, title, description) "
+            "SELECT id, CAST(trim(year) AS INTEGER), title, description FROM timeline_events"
+        )
+        connection.exec_driver_sql("DROP TABLE timeline_events")
+        connection.exec_driver_sql("ALTER TABLE timeline_events_new RENAME TO timeline_events")
+
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_timeline_events_year ON timeline_events (year)")
+
+
+# Миграция 9: индекс для фильтра только по типу проекта (сортировка по признаку FEATURED и дате)
+def _add_project_type_featured_index(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_projects_type_featured_created "
+        "ON projects (project_type, status = 'FEATURED', created_at)"
+    )
+
+
+# Миграция 10: единый формат projects.created_at (как у SQLAlchemy, с микросекундами) для keyset-пагинации.
+# В существующей базе значение по умолчанию колонки остаётся CURRENT_TIMESTAMP, поэтому такие значения
+# при вставке переписывает триггер
+def _normalize_project_created_at(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        f"UPDATE projects SET created_at = {canonical_timestamp_sql('created_at')} "
+        "WHERE length(created_at) = 19"
+    )
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS projects_created_at_ai AFTER INSERT ON projects "
+        "WHEN length(new.created_at) = 19 BEGIN "
+        f"UPDATE projects SET created_at = {canonical_timestamp_sql('new.created_at')} WHERE id = new.id; "
+        "END"
+    )
+
+
+# Список миграций: (версия, описание, функция). Каждая миграция должна быть идемпотентной,
+# так как для новой базы create_all уже создаёт часть объектов. Функция может вернуть действие,
+# которое выполняется после фиксации транзакции миграции (например, удаление файлов)
+MIGRATIONS = [
+    (1, "Составные индексы projects, уникальные email и телефон пользователей", _add_project_indexes),
+    (2, "Полнотекстовый индекс FTS5 по проектам", create_project_search_index),
+    (3, "Сводная статистика проектов project_stats и триггеры её обновления", create_project_stats_triggers),
+    (4, "Колонка projects.file_sha256", _add_project_file_sha256),
+    (5, "Хранилище загрузок по SHA-256 со счётчиком ссылок, дедупликация файлов", _deduplicate_uploads),
+    (6, "Результаты фоновой обработки файлов проектов", _add_project_processing),
+    (7, "Целочисленный год событий ленты времени", _convert_timeline_year),
+    (8, "Полнотекстовый и триграммный индексы FTS5 по событиям ленты времени", create_timeline_search_index),
+    (9, "Индекс projects по типу, признаку FEATURED и дате", _add_project_type_featured_index),
+    (10, "Единый формат даты создания проектов", _normalize_project_created_at),
+]
+
+
+# Миграции с версией больше текущей (версия хранится в PRAGMA user_version)
+def pending_migrations(connection: Connection) -> list:
+    current_version = connection.exec_driver_sql("PRAGMA user_version").scalar() or 0
+    return [migration for migration in MIGRATIONS if migration[0] > current_version]
+
+
+# Применение одной миграции вместе с записью её версии; возвращает действие после фиксации или None
+def apply_migration(connection: Connection, version: int, description: str, migrate: Callable) -> Optional[Callable]:
+    logger.info("Применение миграции %s: %s", version, description)
+    after_commit = migrate(connection)
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+    return after_commit if callable(after_commit) else None
@@ -3,7 +3,14 @@ import enum
 from datetime import datetime
 
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Column, Integer, String, Enum as SQLEnum, Text, JSON, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Enum as SQLEnum, Text, JSON, DateTime, ForeignKey, Index, func, literal_column, text
+
+
+# Время UTC (по умолчанию текущее) в формате, в котором SQLAlchemy хранит DateTime в SQLite (с микросекундами).
+# Даты сравниваются в SQLite как строки, поэтому у всех значений projects.created_at один формат:
+# иначе курсор пагинации ("...:00.000000") не совпадает с CURRENT_TIMESTAMP ("...:00")
+def canonical_timestamp_sql(value: str = "'now'") -> str:
+    return f"strftime('%Y-%m-%d %H:%M:%f000', {value})"
 
 
 # Базовый класс для всех моделей SQLAlchemy
@@ -27,7 +34,7 @@ class TimelineEventModel(Base):
     __tablename__ = "timeline_events"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    year: Mapped[str] = mapped_column(String(10), nullable=False, index=True)
+    year: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
 
@@ -53,8 +60,8 @@ class UserModel(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
-    email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
-    phone_number: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    email: Mapped[str] = mapped_column(String(255), nullable=False, index=True, unique=True)
+    phone_number: Mapped[str] = mapped_column(String(20), nullable=False, index=True, unique=True)
     password: Mapped[str] = mapped_column(String(), nullable=False)
     role = Column(SQLEnum(UserRole), default=UserRole.USER, nullable=False)
 
@@ -73,13 +80,89 @@ class ProjectModel(Base):
     file_path = Column(String(500))
     file_name = Column(String(255))
     file_size = Column(Integer)
+    file_sha256 = Column(String(64))
+    # Результаты фоновой обработки файла (app.project.processing)
+    file_mime_type = Column(String(100))
+    file_page_count = Column(Integer)
+    file_archive_entries = Column(Integer)
+    file_text_excerpt = Column(Text)
 
     # Используем строковый тип для статуса вместо Enum для упрощения
     status = Column(String(50), default="PENDING", nullable=False)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=text(f"({canonical_timestamp_sql()})"))
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     admin_comment = Column(Text)
     rating = Column(Integer, default=0)
     votes_count = Column(Integer, default=0)
 
+
+# Голос пользователя за проект (не более одного голоса на пару проект-пользователь)
+class ProjectVoteModel(Base):
+    __tablename__ = "project_votes"
+
+    project_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    vote = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+# Сводная статистика проектов по паре (статус, тип). Поддерживается триггерами на таблице projects
+class ProjectStatsModel(Base):
+    __tablename__ = "project_stats"
+
+    status = Column(String(50), primary_key=True)
+    project_type = Column(String(50), primary_key=True)
+    projects_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    votes_sum = Column(Integer, nullable=False, default=0)
+
+
+# Файл в хранилище загрузок, адресуемом по SHA-256 содержимого.
+# ref_count - число проектов, ссылающихся на файл
+class FileBlobModel(Base):
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String(500), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Сессия возобновляемой загрузки файла проекта. Текущее смещение - размер частичного файла на диске
+class UploadSessionModel(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    file_name = Column(String(255), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Задача фоновой обработки файла проекта. Статусы: PENDING, RUNNING, DONE, FAILED
+class ProcessingJobModel(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="PENDING", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
+# Признак FEATURED для сортировки списка проектов.
+# Литерал вместо параметра нужен, чтобы выражение в ORDER BY совпадало с индексом по выражению
+project_is_featured = ProjectModel.status == literal_column("'FEATURED'")
+
+# Индексы под основные сценарии выборки проектов
+Index("ix_projects_featured_created", project_is_featured, ProjectModel.created_at)
+Index("ix_projects_status_created", ProjectModel.status, ProjectModel.created_at)
+Index("ix_projects_type_status_created", ProjectModel.project_type, ProjectModel.status, ProjectModel.created_at)
+Index("ix_projects_type_featured_created", ProjectModel.project_type, project_is_featured, ProjectModel.created_at)
+Index("ix_projects_user_created", ProjectModel.user_id, ProjectModel.created_at)
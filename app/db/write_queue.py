@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.database import async_session
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Единица работы: асинхронная функция, получающая сессию писателя
+WriteUnit = Callable[[AsyncSession], Awaitable[Any]]
+
+
+# Исключение при переполнении очереди записи
+class WriteQueueFullError(Exception):
+    pass
+
+
+# Очередь записи с единственным писателем (SQLite допускает только одну пишущую транзакцию)
+class WriteQueue:
+    def __init__(self, session_factory: async_sessionmaker, max_size: int, group_commit_ms: int, max_batch: int):
+        self._session_factory = session_factory
+        self.max_size = max_size
+        self.group_commit_ms = group_commit_ms
+        self.max_batch = max(1, max_batch)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.submitted = 0
+        self.committed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.total_commit_seconds = 0.0
+        self.max_commit_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    # Запуск фоновой задачи писателя
+    def start(self) -> None:
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._worker = asyncio.create_task(self._run())
+
+    # Остановка писателя после обработки всех уже принятых задач
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+        self._queue = None
+
+    # Постановка единицы работы в очередь; возвращает её результат или пробрасывает её исключение
+    async def submit(self, unit: WriteUnit) -> Any:
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((unit, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise WriteQueueFullError()
+
+        self.submitted += 1
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+
+            # Групповая фиксация: собираем задачи, пришедшие в течение окна ожидания
+            if self.group_commit_ms > 0:
+                deadline = loop.time() + self.group_commit_ms / 1000
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            try:
+                await self._execute_batch(batch)
+            except Exception:
+                logger.exception("Ошибка писателя очереди записи")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Ошибка записи в базу данных"))
+
+    # Выполнение пачки задач в одной транзакции (каждая задача в своей точке сохранения)
+    async def _execute_batch(self, batch: list) -> None:
+        started_at = time.perf_counter()
+        outcomes = []
+
+        async with self._session_factory() as session:
+            for unit, future, enqueued_at in batch:
+                self.total_wait_seconds += started_at - enqueued_at
+                try:
+                    if len(batch) == 1:
+                        result = await unit(session)
+                    else:
+                        async with session.begin_nested():
+                            result = await unit(session)
+                except Exception as e:
+                    outcomes.append((future, e, False))
+                else:
+                    outcomes.append((future, result, True))
+
+            # Одиночная задача без точки сохранения: при ошибке откатывается вся транзакция
+            if not any(ok for _, _, ok in outcomes):
+                await session.rollback()
+            else:
+                try:
+                    await session.commit()
+                except Exception as e:
+                    await session.rollback()
+                    outcomes = [(future, e if ok else value, False) for future, value, ok in outcomes]
+
+        elapsed = time.perf_counter() - started_at
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.total_commit_seconds += elapsed
+        self.max_commit_seconds = max(self.max_commit_seconds, elapsed)
+
+        for future, value, ok in outcomes:
+            if ok:
+                self.committed += 1
+            else:
+                self.failed += 1
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    # Метрики очереди: глубина, размер пачек и задержка фиксации
+    def stats(self) -> dict:
+        processed = self.committed + self.failed
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "group_commit_ms": self.group_commit_ms,
+            "submitted": self.submitted,
+            "committed": self.committed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "avg_batch_size": round(processed / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.max_batch_size,
+            "avg_commit_ms": round(self.total_commit_seconds / self.batches * 1000, 2) if self.batches else 0,
+            "max_commit_ms": round(self.max_commit_seconds * 1000, 2),
+            "avg_wait_ms": round(self.total_wait_seconds / processed * 1000, 2) if processed else 0
+        }
+
+
+write_queue = WriteQueue(
+    async_session,
+    max_size=settings.WRITE_QUEUE_MAX_SIZE,
+    group_commit_ms=settings.WRITE_QUEUE_GROUP_COMMIT_MS,
+    max_batch=settings.WRITE_QUEUE_MAX_BATCH
+)
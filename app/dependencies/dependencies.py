@@ -2,14 +2,39 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from typing import List
 from app.security.security import verify_token
-from app.db.database import get_session
+from app.cache.cache import TTLCache
+from app.db.database import get_session, async_read_session
 from app.db.models import UserModel, UserRole
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from sqlalchemy import select
+from config import settings
 
 # Создание экземпляра HTTPBearer для работы с Bearer токенами
 security = HTTPBearer()
 
+# Кэш пользователей по user_id (хранит снимок колонок, а не ORM-объект)
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+USER_CACHE_COLUMNS = ("id", "name", "email", "phone_number", "password", "role")
+
+
+# Сброс записи кэша после изменения или удаления пользователя
+def invalidate_user_cache(user_id: int) -> None:
+    user_cache.invalidate(user_id)
+
+
+# Снимок колонок пользователя для кэша
+def _user_snapshot(user: UserModel) -> dict:
+    return {column: getattr(user, column) for column in USER_CACHE_COLUMNS}
+
+
+# Восстановление пользователя из снимка и привязка к сессии запроса без обращения к БД
+async def _user_from_snapshot(snapshot: dict, session: AsyncSession) -> UserModel:
+    user = UserModel(**snapshot)
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False)
+
 # Функция-зависимость для получения текущего пользователя по токену
 async def get_current_user(
         credentials=Depends(security),
@@ -35,18 +60,30 @@ async def get_current_user(
             detail="Неверные данные в токене"
         )
 
-    # Поиск пользователя в базе данных
-    stmt = select(UserModel).where(UserModel.id == user_id)
-    result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
+    # Поиск пользователя в кэше
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return await _user_from_snapshot(snapshot, session)
 
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пользователь не найден"
-        )
+    # Поиск пользователя в базе данных (через соединение только для чтения). Поколение кэша фиксируется
+    # до чтения: если пользователя изменят во время запроса, прочитанный снимок не попадёт в кэш
+    generation = user_cache.generation()
+    async with async_read_session() as read_session:
+        stmt = select(UserModel).where(UserModel.id == user_id)
+        result = await read_session.execute(stmt)
+        user = result.scalar_one_or_none()
+
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Пользователь не найден"
+            )
+
+        snapshot = _user_snapshot(user)
+
+    user_cache.set(user_id, snapshot, generation=generation)
 
-    return user
+    return await _user_from_snapshot(snapshot, session)
 
 # Функция-зависимость для проверки конкретной роли пользователя
 def require_role(required_role: UserRole):
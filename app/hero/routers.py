@@ -0,0 +1,40 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.db.bulk import detect_format, import_records
+from app.db.models import HeroModel
+from app.dependencies.dependencies import require_admin
+from app.hero.schema import HeroAddSchema
+
+# Создание роутера для работы с героями
+router = APIRouter(prefix="/hero", tags=["Работа с героями"])
+
+DEFAULT_ERA = HeroModel.__table__.c.era.default.arg
+
+
+# Строка таблицы heroes: теги из строки через запятую превращаются в список (колонка JSON)
+def hero_to_row(hero: HeroAddSchema) -> dict:
+    row = hero.model_dump()
+    if row["tags"] is not None:
+        row["tags"] = [tag.strip() for tag in row["tags"].split(",") if tag.strip()]
+    if row["era"] is None:
+        row["era"] = DEFAULT_ERA
+    return row
+
+
+# Эндпоинт массового импорта героев из NDJSON или CSV (только для админов)
+@router.post("/importHeroes", dependencies=[Depends(require_admin)])
+async def import_heroes(
+        request: Request,
+        format: Optional[Literal["ndjson", "csv"]] = Query(None, description="ndjson или csv (по умолчанию по Content-Type)"),
+        batch_size: int = Query(None, ge=1, le=10000, description="Строк в одной пачке записи")
+):
+    return await import_records(
+        request.stream(),
+        detect_format(format, request.headers.get("content-type")),
+        HeroAddSchema,
+        HeroModel,
+        hero_to_row,
+        batch_size
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 # Схема для добавления нового героя
 class HeroAddSchema(BaseModel):
@@ -13,6 +13,14 @@ class HeroAddSchema(BaseModel):
     achievements: str = None
     biography: str = None
 
+    # Теги списком (например, из NDJSON) приводятся к строке через запятую
+    @field_validator('tags', mode='before')
+    @classmethod
+    def join_tags(cls, v):
+        if isinstance(v, list):
+            return ", ".join(str(tag) for tag in v)
+        return v
+
 # Схема для обновления данных героя
 class HeroUpdateSchema(BaseModel):
     name: str = Field(None, max_length=100)
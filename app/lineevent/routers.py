@@ -1,14 +1,56 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy import select
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select, func
 from starlette import status
+from typing import Literal, Optional
+from app.cache.cache import etag_matches
+from app.db.bulk import detect_format, import_records
+from app.db.export import export_response
 from app.db.models import TimelineEventModel
 from app.dependencies.dependencies import require_admin
 from app.lineevent.schema import LineEventAddSchema, LineEventUpdateSchema
-from app import SessionDep
+from app.lineevent.search import deferred_timeline_indexing, search_timeline
+from app.lineevent.snapshot import timeline_store
+from app import SessionDep, ReadSessionDep
 
 # Создание роутера для работы с событиями ленты времени
 router = APIRouter(prefix="/lineevent", tags=["Работа с данными для ленты времени"])
 
+# Проверка диапазона лет (year_from не больше year_to)
+def validate_year_range(year_from: Optional[int], year_to: Optional[int]) -> None:
+    if year_from is not None and year_to is not None and year_from > year_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="year_from не может быть больше year_to"
+        )
+
+
+# Условия по диапазону лет (границы включительно)
+def year_filters(year_from: Optional[int], year_to: Optional[int]) -> list:
+    validate_year_range(year_from, year_to)
+
+    filters = []
+    if year_from is not None:
+        filters.append(TimelineEventModel.year >= year_from)
+    if year_to is not None:
+        filters.append(TimelineEventModel.year <= year_to)
+    return filters
+
+
+# Хронологический порядок (по индексу year); при равном годе - по id
+def year_order(order: str) -> tuple:
+    if order == "desc":
+        return TimelineEventModel.year.desc(), TimelineEventModel.id.desc()
+    return TimelineEventModel.year, TimelineEventModel.id
+
+
+# Ответ готовым JSON из снимка ленты времени с ETag и поддержкой If-None-Match
+def snapshot_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 # Эндпоинт для создания нового события (только для админов)
 @router.post("/createLineEvent", dependencies=[Depends(require_admin)])
 async def create_line_event(event: LineEventAddSchema, session: SessionDep):
@@ -20,36 +62,86 @@ async def create_line_event(event: LineEventAddSchema, session: SessionDep):
     session.add(new_event)
     await session.commit()
     await session.refresh(new_event)
+    await timeline_store.rebuild()
 
     return {"success": "Новое событие для ленты времени добавлено"}
 
-# Эндпоинт для получения всех событий с пагинацией
+# Эндпоинт массового импорта событий из NDJSON или CSV (только для админов).
+# Тело читается потоком, каждая строка проверяется LineEventAddSchema, ошибки строк возвращаются в отчёте.
+# Поисковые индексы обновляются один раз на пачку, а не триггером на каждую строку
+@router.post("/importLineEvents", dependencies=[Depends(require_admin)])
+async def import_line_events(
+        request: Request,
+        format: Optional[Literal["ndjson", "csv"]] = Query(None, description="ndjson или csv (по умолчанию по Content-Type)"),
+        batch_size: int = Query(None, ge=1, le=10000, description="Строк в одной пачке записи")
+):
+    report = await import_records(
+        request.stream(),
+        detect_format(format, request.headers.get("content-type")),
+        LineEventAddSchema,
+        TimelineEventModel,
+        lambda event: event.model_dump(),
+        batch_size,
+        deferred_timeline_indexing
+    )
+
+    if report["imported"]:
+        await timeline_store.rebuild()
+
+    return report
+
+# Эндпоинт потоковой выгрузки всех событий в NDJSON (только для админов)
+@router.get("/exportLineEvents", dependencies=[Depends(require_admin)])
+async def export_line_events(
+        after_id: int = Query(None, ge=0, description="Продолжить выгрузку после события с этим id"),
+        gzip: bool = Query(False, description="Сжать выгрузку gzip")
+):
+    return export_response(
+        select(
+            TimelineEventModel.id,
+            TimelineEventModel.year,
+            TimelineEventModel.title,
+            TimelineEventModel.description
+        ),
+        TimelineEventModel.id,
+        lambda row: row._asdict(),
+        "line_events",
+        after_id,
+        gzip
+    )
+
+# Эндпоинт для получения всех событий с пагинацией.
+# События отдаются из снимка в памяти в хронологическом порядке, без обращения к базе
 @router.get("/getAllLineEvents")
 async def get_all_line_events(
-        session: SessionDep,
+        request: Request,
         skip: int = Query(0, ge=0, description="Сколько событий пропустить"),
-        limit: int = Query(100, ge=1, le=1000, description="Лимит событий")
+        limit: int = Query(100, ge=1, le=1000, description="Лимит событий"),
+        year_from: int = Query(None, description="Год начала диапазона (включительно)"),
+        year_to: int = Query(None, description="Год конца диапазона (включительно)"),
+        order: Literal["asc", "desc"] = Query("asc", description="Порядок по году")
 ):
-    stmt = select(TimelineEventModel).offset(skip).limit(limit)
-    result = await session.execute(stmt)
-    events = result.scalars().all()
+    validate_year_range(year_from, year_to)
 
-    return events
+    snapshot = await timeline_store.get()
+    body = snapshot.select_body(year_from, year_to, order, skip, limit)
+    etag = snapshot.etag if body is snapshot.body else snapshot.etag_for(skip, limit, year_from, year_to, order)
+
+    return snapshot_response(request, body, etag)
 
-# Эндпоинт для получения события по ID
+# Эндпоинт для получения события по ID (из снимка в памяти)
 @router.get("/getLineEvent/{event_id}")
-async def get_line_event(event_id: int, session: SessionDep):
-    stmt = select(TimelineEventModel).where(TimelineEventModel.id == event_id)
-    result = await session.execute(stmt)
-    event = result.scalar_one_or_none()
+async def get_line_event(event_id: int, request: Request):
+    snapshot = await timeline_store.get()
+    body = snapshot.event_body(event_id)
 
-    if not event:
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Событие с ID {event_id} не найдено"
         )
 
-    return event
+    return snapshot_response(request, body, snapshot.etag_for("event", event_id))
 
 # Эндпоинт для обновления события по ID (только для админов)
 @router.put("/updateLineEvent/{event_id}", dependencies=[Depends(require_admin)])
@@ -83,6 +175,7 @@ async def update_line_event(event_id: int, update_event: LineEventUpdateSchema,
 
     await session.commit()
     await session.refresh(event)
+    await timeline_store.rebuild()
 
     return event
 
@@ -101,6 +194,7 @@ async def delete_line_event(event_id: int, session: SessionDep):
 
     await session.delete(event)
     await session.commit()
+    await timeline_store.rebuild()
 
     return {
         "status": "success",
@@ -112,41 +206,74 @@ async def delete_line_event(event_id: int, session: SessionDep):
         }
     }
 
-# Эндпоинт для получения событий по году (только для админов)
+# Эндпоинт для получения событий по году (только для админов), бинарный поиск по снимку в памяти
 @router.get("/getEventsByYear/{year}", dependencies=[Depends(require_admin)])
 async def get_events_by_year(
         year: int,
-        session: SessionDep,
+        request: Request,
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=1000)
 ):
-    # ОШИБКА: год в базе хранится как String, а запрос принимает int
-    stmt = select(TimelineEventModel).where(TimelineEventModel.year == str(year)).offset(skip).limit(limit)
-    result = await session.execute(stmt)
-    events = result.scalars().all()
+    snapshot = await timeline_store.get()
+    body = snapshot.select_body(year, year, "asc", skip, limit)
 
-    return events
+    return snapshot_response(request, body, snapshot.etag_for("year", year, skip, limit))
 
-# Эндпоинт для поиска событий по различным критериям (только для админов)
+# Эндпоинт для поиска событий по различным критериям (только для админов).
+# q - полнотекстовый поиск по названию и описанию с ранжированием, подсветкой и учётом опечаток
 @router.get("/searchEvents", dependencies=[Depends(require_admin)])
 async def search_events(
-        session: SessionDep,
+        session: ReadSessionDep,
+        q: str = Query(None, description="Поиск по названию и описанию"),
         year: int = Query(None, description="Год события"),
+        year_from: int = Query(None, description="Год начала диапазона (включительно)"),
+        year_to: int = Query(None, description="Год конца диапазона (включительно)"),
         title_contains: str = Query(None, description="Часть названия"),
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=1000)
 ):
-    stmt = select(TimelineEventModel)
+    filters = year_filters(year_from, year_to)
 
     if year is not None:
-        stmt = stmt.where(TimelineEventModel.year == str(year))
+        filters.append(TimelineEventModel.year == year)
 
     if title_contains is not None:
-        stmt = stmt.where(TimelineEventModel.title.ilike(f"%{title_contains}%"))
+        filters.append(TimelineEventModel.title.ilike(f"%{title_contains}%"))
 
-    stmt = stmt.offset(skip).limit(limit)
+    if q is not None:
+        return await search_timeline(session, q, filters, skip, limit)
+
+    stmt = select(TimelineEventModel).where(*filters).order_by(*year_order("asc")).offset(skip).limit(limit)
 
     result = await session.execute(stmt)
     events = result.scalars().all()
 
     return events
+
+
+# Эндпоинт для гистограммы событий по десятилетиям или векам (агрегация в SQL)
+@router.get("/getEventsHistogram")
+async def get_events_histogram(
+        session: ReadSessionDep,
+        bucket: Literal["decade", "century"] = Query("decade", description="Размер интервала"),
+        year_from: int = Query(None, description="Год начала диапазона (включительно)"),
+        year_to: int = Query(None, description="Год конца диапазона (включительно)")
+):
+    size = 10 if bucket == "decade" else 100
+    start = (TimelineEventModel.year // size * size).label("start")
+
+    stmt = (
+        select(start, func.count().label("count"))
+        .where(*year_filters(year_from, year_to))
+        .group_by(start)
+        .order_by(start)
+    )
+    result = await session.execute(stmt)
+
+    return {
+        "bucket": bucket,
+        "buckets": [
+            {"start": row.start, "end": row.start + size - 1, "count": row.count}
+            for row in result.all()
+        ]
+    }
@@ -0,0 +1,291 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Optional
+
+from sqlalchemy import Connection, select, literal_column, text, table, column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import TimelineEventModel
+from app.project.search import build_fts_query, fold_sql, fold_text
+
+# Полнотекстовый поиск по названию и описанию событий ленты времени. Два индекса FTS5
+# (external content над таблицей timeline_events, текст с приведением "ё" к "е", как у проектов):
+# - timeline_fts (unicode61): основной поиск по словам с префиксами и ранжированием bm25;
+# - timeline_trigram (trigram): запасной поиск при опечатках, если основной ничего не нашёл
+TIMELINE_FTS = "timeline_fts"
+TIMELINE_TRIGRAM = "timeline_trigram"
+
+TIMELINE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TIMELINE_FTS} USING fts5("
+    "title, description, content='timeline_events', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TIMELINE_TRIGRAM} USING fts5("
+    "title, description, content='timeline_events', content_rowid='id', "
+    "tokenize='trigram')",
+    # Словарь триграмм с числом документов: для запасного поиска выбираются самые редкие триграммы
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TIMELINE_TRIGRAM}_vocab USING fts5vocab({TIMELINE_TRIGRAM}, 'row')",
+)
+
+_NEW_VALUES = f"new.id, {fold_sql('new.title')}, {fold_sql('new.description')}"
+_OLD_VALUES = f"old.id, {fold_sql('old.title')}, {fold_sql('old.description')}"
+
+
+# Триггеры синхронизации индекса с таблицей timeline_events
+def _index_triggers(index: str) -> tuple:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON timeline_events BEGIN "
+        f"INSERT INTO {index}(rowid, title, description) VALUES ({_NEW_VALUES}); "
+        "END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON timeline_events BEGIN "
+        f"INSERT INTO {index}({index}, rowid, title, description) VALUES ('delete', {_OLD_VALUES}); "
+        "END",
+        f"CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF title, description ON timeline_events BEGIN "
+        f"INSERT INTO {index}({index}, rowid, title, description) VALUES ('delete', {_OLD_VALUES}); "
+        f"INSERT INTO {index}(rowid, title, description) VALUES ({_NEW_VALUES}); "
+        "END",
+    )
+
+
+# Вес совпадений в названии относительно описания для bm25
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Разметка совпадений в названии и отрывке описания
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+# Длина отрывка в словах и число слов перед первым совпадением в отрывке запасного поиска
+SNIPPET_WORDS = 16
+SNIPPET_CONTEXT_WORDS = 4
+
+# Запасной поиск: сколько самых редких триграмм слова участвует в запросе, сколько из них должно
+# совпасть (если в индексе нашлась одна, то одна) и минимальное сходство слова для подсветки
+FUZZY_TRIGRAMS_PER_WORD = 4
+FUZZY_MIN_MATCHED = 2
+FUZZY_HIGHLIGHT_RATIO = 0.7
+
+
+# Создание индексов и триггеров (если их нет) и полное перестроение индексов по текущим данным
+def create_timeline_search_index(connection: Connection) -> None:
+    for ddl in TIMELINE_SEARCH_DDL:
+        connection.exec_driver_sql(ddl)
+    for index in (TIMELINE_FTS, TIMELINE_TRIGRAM):
+        for trigger in _index_triggers(index):
+            connection.exec_driver_sql(trigger)
+    rebuild_timeline_search_index(connection)
+
+
+def _index_events(connection: Connection, index: str, after_id: int = 0) -> None:
+    connection.exec_driver_sql(
+        f"INSERT INTO {index}(rowid, title, description) "
+        f"SELECT id, {fold_sql('title')}, {fold_sql('description')} FROM timeline_events WHERE id > ?",
+        (after_id,)
+    )
+
+
+# Встроенная команда 'rebuild' читает текст без приведения "ё", поэтому индексы заполняются заново вручную
+def rebuild_timeline_search_index(connection: Connection) -> None:
+    for index in (TIMELINE_FTS, TIMELINE_TRIGRAM):
+        connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('delete-all')")
+        _index_events(connection, index)
+
+
+# Пачка событий для массового импорта записывается без построчных триггеров AFTER INSERT: они удаляются
+# на время вставки и создаются снова в той же транзакции (другие соединения этого не видят), а новые
+# события (id больше прежнего максимума) добавляются в индексы одним INSERT ... SELECT на индекс.
+# Построчные триггеры замедляют импорт в 2-3 раза
+@asynccontextmanager
+async def deferred_timeline_indexing(session: AsyncSession):
+    connection = await session.connection()
+    last_id = (await connection.exec_driver_sql("SELECT coalesce(max(id), 0) FROM timeline_events")).scalar()
+    for index in (TIMELINE_FTS, TIMELINE_TRIGRAM):
+        await connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index}_ai")
+
+    yield
+
+    for index in (TIMELINE_FTS, TIMELINE_TRIGRAM):
+        await connection.run_sync(_index_events, index, last_id)
+        await connection.exec_driver_sql(_index_triggers(index)[0])
+
+
+# Триграммы слова (как их выделяет токенизатор trigram без учёта регистра)
+def trigrams_of(word: str) -> list:
+    word = word.lower()
+    return list(dict.fromkeys(word[i:i + 3] for i in range(len(word) - 2)))
+
+
+# Запрос к триграммному индексу для строки с опечатками. Для каждого слова берутся самые редкие
+# из встречающихся в индексе триграмм (триграммы с опечаткой обычно не встречаются вовсе),
+# и документ должен содержать не меньше FUZZY_MIN_MATCHED из них. Редкие триграммы
+# ограничивают объём просматриваемых списков документов, поэтому время поиска почти не растёт с архивом
+async def build_trigram_query(session: AsyncSession, search: str) -> Optional[str]:
+    words = [word for word in re.findall(r"\w+", fold_text(search)) if len(word) >= 3]
+    trigrams = {word: trigrams_of(word) for word in words}
+    if not trigrams:
+        return None
+
+    vocab = table(f"{TIMELINE_TRIGRAM}_vocab", column("term"), column("doc"))
+    all_trigrams = {trigram for word_trigrams in trigrams.values() for trigram in word_trigrams}
+    frequency = dict((await session.execute(
+        select(vocab.c.term, vocab.c.doc).where(vocab.c.term.in_(all_trigrams))
+    )).all())
+
+    groups = []
+    for word_trigrams in trigrams.values():
+        present = sorted((t for t in word_trigrams if frequency.get(t)), key=lambda t: frequency[t])
+        rarest = [f'"{trigram}"' for trigram in present[:FUZZY_TRIGRAMS_PER_WORD]]
+        if not rarest:
+            continue
+        need = min(FUZZY_MIN_MATCHED, len(rarest))
+        groups.append(" OR ".join(f"({' AND '.join(group)})" for group in combinations(rarest, need)))
+
+    if not groups:
+        return None
+    return " AND ".join(f"({group})" for group in groups)
+
+
+def _match(index: str, fts_query: str):
+    return text(f"{index} MATCH :fts_query").bindparams(fts_query=fts_query)
+
+
+# Страница найденных событий: пары (id, rank bm25) с учётом условий filters. Таблица событий
+# присоединяется только при наличии условий, подсветка здесь не считается, чтобы не вычислять её
+# для всех совпадений до сортировки
+def ranked_search_query(index: str, fts_query: str, filters: list):
+    fts = table(index, column("rowid"))
+    rank = literal_column(f"bm25({index}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})").label("rank")
+    query = select(fts.c.rowid.label("id"), rank).select_from(fts)
+    if filters:
+        query = query.join(TimelineEventModel, TimelineEventModel.id == fts.c.rowid)
+    return query.where(_match(index, fts_query), *filters).order_by(rank, fts.c.rowid)
+
+
+# Подсветка названия и отрывок описания для событий выбранной страницы (основной индекс).
+# Унарный плюс не даёт передать rowid в FTS5: иначе совпадения по запросу с префиксами
+# собираются заново для каждого id, а так - один раз
+def highlights_query(fts_query: str, event_ids: list):
+    return (
+        select(
+            literal_column(f"{TIMELINE_FTS}.rowid").label("id"),
+            literal_column(
+                f"highlight({TIMELINE_FTS}, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}')"
+            ).label("title_highlight"),
+            literal_column(
+                f"snippet({TIMELINE_FTS}, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', "
+                f"'{SNIPPET_ELLIPSIS}', {SNIPPET_WORDS})"
+            ).label("snippet")
+        )
+        .select_from(table(TIMELINE_FTS))
+        .where(_match(TIMELINE_FTS, fts_query), literal_column(f"+{TIMELINE_FTS}.rowid").in_(event_ids))
+    )
+
+
+async def _events_by_id(session: AsyncSession, event_ids: list) -> dict:
+    result = await session.execute(
+        select(
+            TimelineEventModel.id,
+            TimelineEventModel.year,
+            TimelineEventModel.title,
+            TimelineEventModel.description
+        ).where(TimelineEventModel.id.in_(event_ids))
+    )
+    return {event.id: event._asdict() for event in result.all()}
+
+
+def _is_similar(word: str, query_words: list) -> bool:
+    word = fold_text(word).lower()
+    return any(SequenceMatcher(None, word, query_word).ratio() >= FUZZY_HIGHLIGHT_RATIO for query_word in query_words)
+
+
+# Подсветка для запасного поиска: встроенные highlight/snippet размечают перекрывающиеся
+# триграммы некорректно, поэтому похожие на слова запроса слова размечаются здесь.
+# Возвращает текст с разметкой и отрывок из SNIPPET_WORDS слов вокруг первого совпадения
+def fuzzy_highlight(value: str, query_words: list) -> tuple:
+    parts = re.split(r"(\w+)", value)
+    marked = []
+    for i in range(1, len(parts), 2):
+        if _is_similar(parts[i], query_words):
+            parts[i] = f"{HIGHLIGHT_START}{parts[i]}{HIGHLIGHT_END}"
+            marked.append(i)
+
+    # Слова стоят на нечётных позициях, разделители между ними - на чётных
+    first = max(1, (marked[0] if marked else 1) - 2 * SNIPPET_CONTEXT_WORDS)
+    last = min(len(parts), first + 2 * SNIPPET_WORDS - 1)
+    snippet = "".join(parts[first:last]).strip()
+    if first > 1:
+        snippet = SNIPPET_ELLIPSIS + snippet
+    if last < len(parts) - 1:
+        snippet += SNIPPET_ELLIPSIS
+    return "".join(parts), snippet
+
+
+# Поиск событий по строке search с дополнительными условиями filters, по релевантности.
+# Если основной индекс ничего не нашёл, выполняется запасной поиск по триграммам (в ответе fuzzy=true)
+async def search_timeline(session: AsyncSession, search: str, filters: list, skip: int, limit: int) -> list:
+    fts_query = build_fts_query(search)
+
+    if fts_query:
+        ranked = (await session.execute(
+            ranked_search_query(TIMELINE_FTS, fts_query, filters).offset(skip).limit(limit)
+        )).all()
+        # Пустая страница за пределами найденного - не повод для запасного поиска
+        if ranked or (skip > 0 and (await session.execute(
+            ranked_search_query(TIMELINE_FTS, fts_query, filters).limit(1)
+        )).first() is not None):
+            event_ids = [row.id for row in ranked]
+            events = await _events_by_id(session, event_ids)
+            highlights = {
+                row.id: row for row in (await session.execute(highlights_query(fts_query, event_ids))).all()
+            }
+            return [
+                {
+                    **events[row.id],
+                    "title_highlight": highlights[row.id].title_highlight,
+                    "snippet": highlights[row.id].snippet,
+                    "rank": row.rank,
+                    "fuzzy": False
+                }
+                for row in ranked if row.id in events and row.id in highlights
+            ]
+
+    trigram_query = await build_trigram_query(session, search)
+    if not trigram_query:
+        return []
+
+    ranked = (await session.execute(
+        ranked_search_query(TIMELINE_TRIGRAM, trigram_query, filters).offset(skip).limit(limit)
+    )).all()
+    events = await _events_by_id(session, [row.id for row in ranked])
+
+    query_words = [word.lower() for word in re.findall(r"\w+", fold_text(search))]
+    results = []
+    for row in ranked:
+        event = events.get(row.id)
+        if event is None:
+            continue
+        title_highlight, _ = fuzzy_highlight(event["title"], query_words)
+        _, snippet = fuzzy_highlight(event["description"], query_words)
+        results.append({
+            **event,
+            "title_highlight": title_highlight,
+            "snippet": snippet,
+            "rank": row.rank,
+            "fuzzy": True
+        })
+    return results
+
+
+# Перестроение индексов для существующей базы: python -m app.lineevent.search
+async def rebuild() -> None:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(create_timeline_search_index)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
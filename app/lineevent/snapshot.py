@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+import orjson
+from sqlalchemy import select
+
+from app.db.database import async_read_session
+from app.db.models import TimelineEventModel
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Неизменяемый снимок ленты времени, отсортированный по (year, id). Каждое событие сериализуется
+# в JSON один раз при построении снимка, поэтому ответ собирается склейкой готовых байтов
+class TimelineSnapshot:
+    def __init__(self, events: list):
+        self.events = tuple(events)
+        self.years = [event["year"] for event in self.events]
+        self.serialized = [orjson.dumps(event) for event in self.events]
+        self.index_by_id = {event["id"]: i for i, event in enumerate(self.events)}
+        self.body = self.join(self.serialized)
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{self.digest}"'
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def join(parts: list) -> bytes:
+        return b"[" + b",".join(parts) + b"]"
+
+    # Границы [start, end) событий с годом в диапазоне year_from..year_to (бинарный поиск)
+    def year_range(self, year_from: Optional[int], year_to: Optional[int]) -> tuple:
+        start = bisect_left(self.years, year_from) if year_from is not None else 0
+        end = bisect_right(self.years, year_to) if year_to is not None else len(self.years)
+        return start, max(start, end)
+
+    # Тело ответа со списком событий диапазона с учётом порядка и пагинации
+    def select_body(self, year_from: Optional[int], year_to: Optional[int],
+                    order: str = "asc", skip: int = 0, limit: Optional[int] = None) -> bytes:
+        start, end = self.year_range(year_from, year_to)
+
+        # Весь снимок целиком - готовое тело без склейки
+        if order == "asc" and start == 0 and end == len(self.events) and skip == 0 \
+                and (limit is None or limit >= len(self.events)):
+            return self.body
+
+        if order == "asc":
+            start += skip
+            if limit is not None:
+                end = min(end, start + limit)
+            return self.join(self.serialized[start:end])
+
+        stop = end - skip
+        begin = start if limit is None else max(start, stop - limit)
+        return self.join(self.serialized[begin:max(begin, stop)][::-1])
+
+    # Готовый JSON одного события (None, если события нет)
+    def event_body(self, event_id: int) -> Optional[bytes]:
+        index = self.index_by_id.get(event_id)
+        return self.serialized[index] if index is not None else None
+
+    # ETag ответа: для всего снимка - хэш содержимого, для выборки - хэш снимка и параметров выборки
+    def etag_for(self, *params) -> str:
+        if not params:
+            return self.etag
+        key = hashlib.blake2b(repr(params).encode("utf-8"), digest_size=8).hexdigest()
+        return f'"{self.digest}-{key}"'
+
+
+# Хранилище текущего снимка. Снимок заменяется целиком одним присваиванием, поэтому запросы
+# всегда видят согласованное состояние. При нескольких процессах приложения изменения, сделанные
+# другим процессом, подхватываются фоновой перезагрузкой снимка старше max_age_seconds
+class TimelineStore:
+    def __init__(self, max_age_seconds: int):
+        self.max_age_seconds = max_age_seconds
+        self._snapshot: Optional[TimelineSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loads = 0
+        self.total_load_seconds = 0.0
+
+    # Построение нового снимка по данным базы и атомарная замена текущего
+    async def load(self) -> TimelineSnapshot:
+        async with self._lock:
+            started_at = time.perf_counter()
+            async with async_read_session() as session:
+                result = await session.execute(
+                    select(
+                        TimelineEventModel.id,
+                        TimelineEventModel.year,
+                        TimelineEventModel.title,
+                        TimelineEventModel.description
+                    ).order_by(TimelineEventModel.year, TimelineEventModel.id)
+                )
+                events = [row._asdict() for row in result.all()]
+
+            self._snapshot = TimelineSnapshot(events)
+            self.loads += 1
+            self.total_load_seconds += time.perf_counter() - started_at
+            return self._snapshot
+
+    # Перестроение после изменения ленты времени
+    async def rebuild(self) -> None:
+        await self.load()
+
+    # Текущий снимок; при отсутствии загружается, при устаревании обновляется в фоне
+    async def get(self) -> TimelineSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.load()
+
+        if self.max_age_seconds > 0 and time.monotonic() - snapshot.loaded_at > self.max_age_seconds:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh())
+        return snapshot
+
+    async def _refresh(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Ошибка обновления снимка ленты времени")
+
+    # Метрики снимка
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "events": len(snapshot.events) if snapshot else 0,
+            "body_bytes": len(snapshot.body) if snapshot else 0,
+            "etag": snapshot.etag if snapshot else None,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "loads": self.loads,
+            "avg_load_ms": round(self.total_load_seconds / self.loads * 1000, 2) if self.loads else 0
+        }
+
+
+timeline_store = TimelineStore(max_age_seconds=settings.TIMELINE_SNAPSHOT_MAX_AGE_SECONDS)
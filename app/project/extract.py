@@ -0,0 +1,153 @@
+import hashlib
+import mimetypes
+import mmap
+import re
+import zipfile
+from typing import Optional
+from xml.etree import ElementTree
+
+# Анализ загруженных файлов. Функции выполняются в отдельном процессе (ProcessPoolExecutor),
+# поэтому модуль не импортирует ничего из приложения и работает только со стандартной библиотекой
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Сигнатуры форматов по первым байтам файла
+MAGIC_NUMBERS = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"AC10", "image/vnd.dwg"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"Rar!\x1a\x07", "application/vnd.rar"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+)
+
+# Документы Office Open XML и OpenDocument определяются по содержимому ZIP-архива
+OOXML_TYPES = {
+    "word/document.xml": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xl/workbook.xml": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt/presentation.xml": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+XML_TAG_PATTERN = re.compile(r"<[^>]+>")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# SHA-256 файла (чтение блоками)
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Определение MIME-типа по сигнатуре, для неизвестных форматов - по имени файла
+def sniff_mime_type(path: str, file_name: Optional[str]) -> str:
+    with open(path, "rb") as f:
+        head = f.read(512)
+
+    for magic, mime_type in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return mime_type
+
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+        return "application/zip"
+
+    guessed = mimetypes.guess_type(file_name or "")[0]
+    if guessed:
+        return guessed
+
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError:
+        return "application/octet-stream"
+    return "text/plain"
+
+
+# Число страниц PDF: количество объектов /Type /Page (поиск по отображённому в память файлу)
+def pdf_page_count(path: str) -> Optional[int]:
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return sum(1 for _ in PDF_PAGE_PATTERN.finditer(data)) or None
+        except ValueError:
+            return None
+
+
+def _xml_text(data: bytes) -> str:
+    text = XML_TAG_PATTERN.sub(" ", data.decode("utf-8", errors="ignore"))
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+# Анализ ZIP-архива: тип документа, число записей, страниц (docProps/app.xml) и текст документа Word
+def inspect_zip(path: str, excerpt_chars: int) -> dict:
+    result = {}
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        result["archive_entries"] = len(names)
+
+        for entry, mime_type in OOXML_TYPES.items():
+            if entry in names:
+                result["mime_type"] = mime_type
+                break
+
+        if "mimetype" in names:
+            result["mime_type"] = archive.read("mimetype").decode("ascii", errors="ignore").strip() or None
+
+        if "docProps/app.xml" in names:
+            try:
+                root = ElementTree.fromstring(archive.read("docProps/app.xml"))
+            except ElementTree.ParseError:
+                root = None
+            if root is not None:
+                for element in root.iter():
+                    if element.tag.endswith("}Pages") and (element.text or "").isdigit():
+                        result["page_count"] = int(element.text)
+
+        for entry in ("word/document.xml", "content.xml"):
+            if entry in names:
+                with archive.open(entry) as document:
+                    # Для отрывка достаточно начала документа
+                    result["text_excerpt"] = _xml_text(document.read(excerpt_chars * 20))[:excerpt_chars]
+                break
+
+    return result
+
+
+# Начало текстового файла
+def text_excerpt(path: str, excerpt_chars: int) -> str:
+    with open(path, "rb") as f:
+        data = f.read(excerpt_chars * 4)
+    return WHITESPACE_PATTERN.sub(" ", data.decode("utf-8", errors="ignore")).strip()[:excerpt_chars]
+
+
+# Полная обработка файла проекта: проверка контрольной суммы, MIME-тип, число страниц,
+# содержимое архива и отрывок текста. Возвращает словарь с результатами
+def process_project_file(path: str, file_name: Optional[str], expected_sha256: Optional[str],
+                         excerpt_chars: int) -> dict:
+    if expected_sha256 and file_sha256(path) != expected_sha256:
+        raise ValueError("Контрольная сумма файла не совпадает с сохранённой")
+
+    result = {
+        "mime_type": sniff_mime_type(path, file_name),
+        "page_count": None,
+        "archive_entries": None,
+        "text_excerpt": None,
+    }
+
+    if result["mime_type"] == "application/pdf":
+        result["page_count"] = pdf_page_count(path)
+    elif result["mime_type"] == "application/zip":
+        try:
+            result.update(inspect_zip(path, excerpt_chars))
+        except zipfile.BadZipFile:
+            pass
+    elif result["mime_type"].startswith("text/"):
+        result["text_excerpt"] = text_excerpt(path, excerpt_chars)
+
+    return result
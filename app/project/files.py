@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import async_read_session
+from app.db.models import ProjectModel, FileBlobModel
+from app.db.write_queue import write_queue
+from app.project.processing import delete_processing_jobs
+from app.project.storage import UPLOAD_DIR, release_blob
+from app.project.uploads import SESSION_DIR
+from app.project.votes import delete_project_votes
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Удаление проектов вместе с голосами, задачами обработки и ссылками на файлы.
+# Возвращает пути файлов, которые нужно удалить после фиксации транзакции
+async def delete_projects(session: AsyncSession, projects: Iterable[ProjectModel]) -> list:
+    paths = []
+    for project in projects:
+        if project.file_sha256:
+            path = await release_blob(session, project.file_sha256)
+        else:
+            path = project.file_path
+        if path:
+            paths.append(path)
+
+        await delete_project_votes(session, project.id)
+        await delete_processing_jobs(session, project.id)
+        await session.delete(project)
+    return paths
+
+
+# Удаление всех проектов пользователя (при удалении пользователя)
+async def delete_user_projects(session: AsyncSession, user_id: int) -> list:
+    projects = (await session.execute(
+        select(ProjectModel).where(ProjectModel.user_id == user_id)
+    )).scalars().all()
+    return await delete_projects(session, projects)
+
+
+# Каталог файлов, отобранных для удаления (внутри UPLOAD_DIR, чтобы перенос был переименованием)
+TRASH_DIR = os.path.join(UPLOAD_DIR, ".trash")
+
+
+# Перенос файлов в TRASH_DIR под уникальными именами; возвращает пары (новый путь, размер).
+# Файлы вне UPLOAD_DIR не могут быть созданы заново хранилищем и остаются на месте до удаления
+def _claim_files(paths: list) -> list:
+    os.makedirs(TRASH_DIR, exist_ok=True)
+    upload_dir = os.path.abspath(UPLOAD_DIR)
+    claimed = []
+    for path in paths:
+        try:
+            size = os.stat(path).st_size
+            if os.path.commonpath([upload_dir, os.path.abspath(path)]) == upload_dir:
+                target = os.path.join(TRASH_DIR, uuid.uuid4().hex)
+                os.replace(path, target)
+                path = target
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            logger.warning("Не удалось подготовить файл %s к удалению: %s", path, e)
+            continue
+        claimed.append((path, size))
+    return claimed
+
+
+def _remove_files(claimed: list) -> tuple:
+    removed = 0
+    reclaimed = 0
+    for path, size in claimed:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            logger.warning("Не удалось удалить файл %s: %s", path, e)
+            continue
+        removed += 1
+        reclaimed += size
+    return removed, reclaimed
+
+
+# Очередь отложенного удаления файлов. Запросы на удаление возвращаются сразу, а файлы удаляются
+# фоновой задачей пачками. В транзакции писателя проверяется, что на файл больше не ссылаются
+# ни проекты, ни хранилище (файл с тем же содержимым мог быть загружен заново), и файлы без ссылок
+# переименовываются в TRASH_DIR. Само удаление выполняется уже вне писателя: загрузка, зафиксированная
+# после проверки, не найдёт файл на месте и положит его заново (place_blob).
+# Очередь хранится в памяти; файлы, не удалённые из-за остановки процесса, подберёт OrphanSweeper
+class DeletionQueue:
+    def __init__(self, batch_size: int, interval_ms: int):
+        self.batch_size = max(1, batch_size)
+        self.interval_ms = interval_ms
+        self._pending: list = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.scheduled = 0
+        self.removed_files = 0
+        self.reclaimed_bytes = 0
+        self.skipped_referenced = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Остановка с удалением оставшихся файлов
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.drain()
+
+    # Постановка файлов в очередь на удаление (без ожидания)
+    def schedule(self, paths: Iterable[str]) -> None:
+        paths = [path for path in paths if path]
+        if not paths:
+            return
+        self._pending.extend(paths)
+        self.scheduled += len(paths)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Ошибка удаления файлов")
+
+    # Удаление всех файлов из очереди; возвращает (удалено файлов, освобождено байт)
+    async def drain(self) -> tuple:
+        removed = 0
+        reclaimed = 0
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                # При ошибке пачка остаётся в очереди до следующей попытки
+                batch_removed, batch_reclaimed = await self._remove_batch(batch)
+                del self._pending[:len(batch)]
+                removed += batch_removed
+                reclaimed += batch_reclaimed
+        return removed, reclaimed
+
+    async def _remove_batch(self, batch: list) -> tuple:
+        async def claim(session):
+            referenced = set((await session.execute(
+                union(
+                    select(ProjectModel.file_path).where(ProjectModel.file_path.in_(batch)),
+                    select(FileBlobModel.path).where(FileBlobModel.path.in_(batch))
+                )
+            )).scalars())
+            unreferenced = [path for path in dict.fromkeys(batch) if path not in referenced]
+            return await run_in_threadpool(_claim_files, unreferenced), len(batch) - len(unreferenced)
+
+        claimed, skipped = await write_queue.submit(claim)
+        removed, reclaimed = await run_in_threadpool(_remove_files, claimed)
+        self.batches += 1
+        self.removed_files += removed
+        self.reclaimed_bytes += reclaimed
+        self.skipped_referenced += skipped
+        return removed, reclaimed
+
+    # Метрики очереди удаления
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "scheduled": self.scheduled,
+            "removed_files": self.removed_files,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "skipped_referenced": self.skipped_referenced,
+            "batches": self.batches
+        }
+
+
+# Периодический поиск файлов в UPLOAD_DIR, на которые не ссылается ни один проект
+# (projects.file_path) и ни одна запись хранилища. Файлы моложе grace_seconds пропускаются:
+# это могут быть загрузки, транзакция которых ещё не зафиксирована. Каталог незавершённых
+# возобновляемых загрузок обслуживает UploadSessionSweeper
+class OrphanSweeper:
+    def __init__(self, deletion_queue: DeletionQueue, interval_seconds: int, grace_seconds: int):
+        self.deletion_queue = deletion_queue
+        self.interval_seconds = interval_seconds
+        self.grace_seconds = grace_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.removed_files = 0
+        self.reclaimed_bytes = 0
+        self.last_sweep: Optional[dict] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Ошибка поиска неиспользуемых файлов")
+
+    def _scan(self) -> list:
+        threshold = time.time() - self.grace_seconds
+        skip_dir = os.path.abspath(SESSION_DIR)
+        files = []
+        for root, dirs, names in os.walk(UPLOAD_DIR):
+            dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) != skip_dir]
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_mtime < threshold:
+                        files.append(path)
+                except FileNotFoundError:
+                    continue
+        return files
+
+    # Однократный поиск и удаление; возвращает отчёт (файлов и байт освобождено)
+    async def sweep(self) -> dict:
+        started_at = time.perf_counter()
+        files = await run_in_threadpool(self._scan)
+
+        async with async_read_session() as session:
+            referenced = set((await session.execute(
+                union(
+                    select(ProjectModel.file_path).where(ProjectModel.file_path.is_not(None)),
+                    select(FileBlobModel.path)
+                )
+            )).scalars())
+
+        # Пути в базе могут быть записаны в другой форме (например, с "./")
+        referenced = {os.path.normpath(path) for path in referenced}
+        orphans = [path for path in files if os.path.normpath(path) not in referenced]
+
+        self.deletion_queue.schedule(orphans)
+        removed, reclaimed = await self.deletion_queue.drain()
+
+        self.sweeps += 1
+        self.removed_files += removed
+        self.reclaimed_bytes += reclaimed
+        self.last_sweep = {
+            "scanned_files": len(files),
+            "orphaned_files": len(orphans),
+            "removed_files": removed,
+            "reclaimed_bytes": reclaimed,
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 2)
+        }
+        if orphans:
+            logger.info(
+                "Неиспользуемые файлы: найдено %s, удалено %s, освобождено %s байт",
+                len(orphans), removed, reclaimed
+            )
+        return self.last_sweep
+
+    # Метрики поиска
+    def stats(self) -> dict:
+        return {
+            "sweeps": self.sweeps,
+            "removed_files": self.removed_files,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_sweep": self.last_sweep
+        }
+
+
+deletion_queue = DeletionQueue(
+    batch_size=settings.FILE_DELETE_BATCH_SIZE,
+    interval_ms=settings.FILE_DELETE_INTERVAL_MS
+)
+
+orphan_sweeper = OrphanSweeper(
+    deletion_queue,
+    interval_seconds=settings.ORPHAN_SWEEP_INTERVAL_SECONDS,
+    grace_seconds=settings.ORPHAN_GRACE_SECONDS
+)
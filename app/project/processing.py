@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, delete, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ProjectModel, ProcessingJobModel
+from app.db.write_queue import write_queue
+from app.project.extract import process_project_file
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Постановка файла проекта в очередь обработки (в транзакции, создающей проект)
+def enqueue_processing(session: AsyncSession, project_id: int) -> None:
+    session.add(ProcessingJobModel(project_id=project_id, status="PENDING", attempts=0, created_at=datetime.utcnow()))
+
+
+# Удаление задач обработки проекта (при удалении самого проекта)
+async def delete_processing_jobs(session: AsyncSession, project_id: int) -> None:
+    await session.execute(delete(ProcessingJobModel).where(ProcessingJobModel.project_id == project_id))
+
+
+# Фоновая обработка загруженных файлов в пуле процессов. Задачи хранятся в таблице processing_jobs,
+# поэтому переживают перезапуск: задача, оставшаяся в статусе RUNNING дольше job_timeout_seconds,
+# забирается повторно, пока не исчерпаны попытки. Обработка файла ограничена task_timeout_seconds.
+# Захват задач и запись результатов идут через очередь записи
+class ProcessingQueue:
+    def __init__(self, workers: int, max_attempts: int, job_timeout_seconds: int, task_timeout_seconds: int,
+                 poll_interval_seconds: int, excerpt_chars: int):
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.job_timeout_seconds = job_timeout_seconds
+        self.task_timeout_seconds = task_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.excerpt_chars = excerpt_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._terminated = weakref.WeakSet()
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._wakeup = asyncio.Event()
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.timed_out = 0
+        self.total_process_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    # Запуск цикла выборки задач
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Остановка: незавершённые задачи остаются в базе и будут обработаны после перезапуска
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for task in list(self._running):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # Сигнал о новых задачах (не ждать интервала опроса)
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            free_slots = self.workers - len(self._running)
+
+            jobs = []
+            if free_slots > 0:
+                try:
+                    jobs = await write_queue.submit(lambda session: self._claim(session, free_slots))
+                except Exception:
+                    logger.exception("Ошибка выборки задач обработки файлов")
+
+            for job in jobs:
+                task = asyncio.create_task(self._process(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            # Пока есть свободные процессы и задачи в очереди, выбираем дальше без ожидания
+            if jobs and len(self._running) < self.workers:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    # Остановка пула процессов с зависшей задачей: выполняющуюся в ProcessPoolExecutor задачу отменить нельзя,
+    # поэтому процессы пула завершаются, а новый пул создаётся при следующей задаче
+    def _terminate_executor(self, executor: ProcessPoolExecutor) -> None:
+        if self._executor is executor:
+            self._executor = None
+        self._terminated.add(executor)
+        for process in list((executor._processes or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Захват до limit задач: ожидающие и брошенные (RUNNING дольше таймаута). Брошенные задачи
+    # с исчерпанными попытками (например, процесс падает на файле) переводятся в FAILED
+    async def _claim(self, session: AsyncSession, limit: int) -> list:
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.job_timeout_seconds)
+        stale = and_(ProcessingJobModel.status == "RUNNING", ProcessingJobModel.started_at < stale_before)
+
+        exhausted = await session.execute(
+            update(ProcessingJobModel)
+            .where(stale, ProcessingJobModel.attempts >= self.max_attempts)
+            .values(status="FAILED", error="Обработка не завершилась за отведённые попытки", finished_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        self.failed += exhausted.rowcount
+
+        job_ids = (await session.execute(
+            select(ProcessingJobModel.id)
+            .where(or_(ProcessingJobModel.status == "PENDING", stale))
+            .order_by(ProcessingJobModel.id)
+            .limit(limit)
+        )).scalars().all()
+        if not job_ids:
+            return []
+
+        await session.execute(
+            update(ProcessingJobModel)
+            .where(ProcessingJobModel.id.in_(job_ids))
+            .values(status="RUNNING", attempts=ProcessingJobModel.attempts + 1, started_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+        rows = (await session.execute(
+            select(
+                ProcessingJobModel.id,
+                ProcessingJobModel.attempts,
+                ProjectModel.id.label("project_id"),
+                ProjectModel.file_path,
+                ProjectModel.file_name,
+                ProjectModel.file_sha256
+            )
+            .join(ProjectModel, ProjectModel.id == ProcessingJobModel.project_id)
+            .where(ProcessingJobModel.id.in_(job_ids))
+        )).all()
+
+        # Задачи удалённых проектов и проектов без файла обрабатывать нечего
+        orphaned = set(job_ids) - {row.id for row in rows if row.file_path}
+        if orphaned:
+            await session.execute(delete(ProcessingJobModel).where(ProcessingJobModel.id.in_(orphaned)))
+
+        return [row for row in rows if row.id not in orphaned]
+
+    # Обработка одной задачи в пуле процессов и запись результата. Задачи, прерванные остановкой пула
+    # из-за чужой зависшей задачи, возвращаются в очередь без расхода попытки
+    async def _process(self, job) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        executor = self._get_executor()
+
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(
+                    executor,
+                    process_project_file,
+                    job.file_path,
+                    job.file_name,
+                    job.file_sha256,
+                    self.excerpt_chars
+                ),
+                self.task_timeout_seconds
+            )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._terminate_executor(executor)
+            self.timed_out += 1
+            logger.warning("Обработка файла проекта %s не завершилась за %s с", job.project_id, self.task_timeout_seconds)
+            await self._save_failure(job, f"Обработка не завершилась за {self.task_timeout_seconds} с")
+        except BrokenProcessPool as e:
+            if executor in self._terminated:
+                await self._requeue(job)
+            else:
+                if self._executor is executor:
+                    self._executor = None
+                logger.warning("Ошибка обработки файла проекта %s: %s", job.project_id, e)
+                await self._save_failure(job, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            logger.warning("Ошибка обработки файла проекта %s: %s", job.project_id, e)
+            await self._save_failure(job, f"{type(e).__name__}: {e}")
+        else:
+            self.total_process_seconds += time.perf_counter() - started_at
+            await self._save_result(job, result)
+
+        self.notify()
+
+    async def _save_result(self, job, result: dict) -> None:
+        async def save(session):
+            await session.execute(
+                update(ProjectModel)
+                .where(ProjectModel.id == job.project_id)
+                .values(
+                    file_mime_type=result["mime_type"],
+                    file_page_count=result["page_count"],
+                    file_archive_entries=result["archive_entries"],
+                    file_text_excerpt=result["text_excerpt"]
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.execute(
+                update(ProcessingJobModel)
+                .where(ProcessingJobModel.id == job.id)
+                .values(status="DONE", error=None, finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+
+        try:
+            await write_queue.submit(save)
+            self.completed += 1
+        except Exception:
+            logger.exception("Ошибка записи результата обработки файла проекта %s", job.project_id)
+
+    # Возврат задачи в очередь с возвратом попытки
+    async def _requeue(self, job) -> None:
+        async def save(session):
+            await session.execute(
+                update(ProcessingJobModel)
+                .where(ProcessingJobModel.id == job.id)
+                .values(status="PENDING", attempts=ProcessingJobModel.attempts - 1, started_at=None)
+                .execution_options(synchronize_session=False)
+            )
+
+        try:
+            await write_queue.submit(save)
+        except Exception:
+            logger.exception("Ошибка записи состояния задачи обработки %s", job.id)
+
+    # Ошибка: повтор, пока не исчерпаны попытки, затем статус FAILED
+    async def _save_failure(self, job, error: str) -> None:
+        final = job.attempts >= self.max_attempts
+
+        async def save(session):
+            await session.execute(
+                update(ProcessingJobModel)
+                .where(ProcessingJobModel.id == job.id)
+                .values(
+                    status="FAILED" if final else "PENDING",
+                    error=error,
+                    finished_at=datetime.utcnow() if final else None
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        try:
+            await write_queue.submit(save)
+            if final:
+                self.failed += 1
+            else:
+                self.retried += 1
+        except Exception:
+            logger.exception("Ошибка записи состояния задачи обработки %s", job.id)
+
+    # Метрики обработки
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "timed_out": self.timed_out,
+            "avg_process_ms": round(self.total_process_seconds / self.completed * 1000, 2) if self.completed else 0
+        }
+
+
+processing_queue = ProcessingQueue(
+    workers=settings.PROCESSING_WORKERS,
+    max_attempts=settings.PROCESSING_MAX_ATTEMPTS,
+    job_timeout_seconds=settings.PROCESSING_JOB_TIMEOUT_SECONDS,
+    task_timeout_seconds=settings.PROCESSING_TASK_TIMEOUT_SECONDS,
+    poll_interval_seconds=settings.PROCESSING_POLL_INTERVAL_SECONDS,
+    excerpt_chars=settings.PROCESSING_TEXT_EXCERPT_CHARS
+)
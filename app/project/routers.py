@@ -1,19 +1,42 @@
-from fastapi import APIRouter, Depends, Form, UploadFile, File, HTTPException, Query, Body
-from sqlalchemy import select, func, or_
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Body, Request, Response, Header
+from fastapi.responses import FileResponse, ORJSONResponse
+from sqlalchemy import select, func, tuple_, delete
+from starlette.concurrency import run_in_threadpool
+import base64
+import json
+import mimetypes
 import os
 import uuid
 from datetime import datetime
 from typing import Optional
 
-from app import SessionDep
-from app.db.models import UserModel, ProjectModel, UserRole
+from app import SessionDep, ReadSessionDep
+from app.cache.cache import TTLCache, etag_matches
+from app.db.models import (
+    UserModel, ProjectModel, UserRole, UploadSessionModel, ProcessingJobModel, project_is_featured
+)
+from app.db.export import export_response
+from app.db.write_queue import write_queue
 from app.dependencies.dependencies import require_admin_or_user
-from app.project.schema import ProjectStatusUpdateSchema
+from app.project.schema import ProjectStatusUpdateSchema, UploadSessionCreateSchema
+from app.project.storage import (
+    StoredFile, receive_upload, attach_blob, place_blob, remove_file, hash_file, content_disposition
+)
+from app.project.files import delete_projects, deletion_queue, orphan_sweeper
+from app.project.processing import enqueue_processing, processing_queue
+from app.project.uploads import session_part_path, create_part_file, part_offset, append_chunk
+from app.project.search import build_fts_query, project_search_subquery
+from app.project.votes import apply_vote, current_vote, vote_buffer
+from app.project.stats import project_stats_query, stats_response, find_project_stats_drift, rebuild_project_stats
+from config import settings
 
 projects_router = APIRouter(prefix="/projects", tags=["Проекты КБ Будущего"])
 
-UPLOAD_DIR = "uploads/projects"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Кэш общего количества проектов по кортежу фильтров (status, project_type, search)
+project_count_cache = TTLCache(
+    maxsize=settings.PROJECT_COUNT_CACHE_SIZE,
+    ttl=settings.PROJECT_COUNT_CACHE_TTL_SECONDS
+)
 
 
 # ============================================================================
@@ -21,6 +44,9 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # ============================================================================
 
 def project_to_response(project):
+    # Рейтинг с учётом голосов, ещё не записанных буфером отложенной записи
+    rating, votes_count = vote_buffer.merge(project.id, project.rating, project.votes_count)
+
     return {
         "id": project.id,
         "user_id": project.user_id,
@@ -33,138 +59,543 @@ def project_to_response(project):
         "file_path": project.file_path,
         "file_name": project.file_name,
         "file_size": project.file_size,
+        "file_sha256": project.file_sha256,
+        "file_mime_type": project.file_mime_type,
+        "file_page_count": project.file_page_count,
         "status": (project.status or "PENDING").lower(),
         "created_at": project.created_at,
         "updated_at": project.updated_at,
         "admin_comment": project.admin_comment,
-        "rating": project.rating or 0,
-        "votes_count": project.votes_count or 0
+        "rating": rating,
+        "votes_count": votes_count
     }
 
 
+# Колонки проекта для списков: выбираются Core-запросом без загрузки ORM-объектов
+# и без служебных колонок (например, file_text_excerpt). Порядок совпадает с project_to_response
+PROJECT_RESPONSE_COLUMNS = (
+    ProjectModel.id,
+    ProjectModel.user_id,
+    ProjectModel.user_name,
+    ProjectModel.user_email,
+    ProjectModel.user_phone,
+    ProjectModel.title,
+    ProjectModel.description,
+    ProjectModel.project_type,
+    ProjectModel.file_path,
+    ProjectModel.file_name,
+    ProjectModel.file_size,
+    ProjectModel.file_sha256,
+    ProjectModel.file_mime_type,
+    ProjectModel.file_page_count,
+    ProjectModel.status,
+    ProjectModel.created_at,
+    ProjectModel.updated_at,
+    ProjectModel.admin_comment,
+    ProjectModel.rating,
+    ProjectModel.votes_count,
+)
+
+
+# Ответ для строки запроса по PROJECT_RESPONSE_COLUMNS (тот же формат, что и project_to_response)
+def project_row_to_response(row) -> dict:
+    item = row._asdict()
+    item["status"] = (item["status"] or "PENDING").lower()
+    item["rating"], item["votes_count"] = vote_buffer.merge(row.id, row.rating, row.votes_count)
+    return item
+
+
 def check_user_access(project, user):
     if user.role != UserRole.ADMIN and project.user_id != user.id:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
 
 
+# Условия фильтрации списка проектов (общие для выборки страницы и подсчёта)
+def project_filters(status: Optional[str], project_type: Optional[str]) -> list:
+    filters = []
+
+    if status:
+        filters.append(ProjectModel.status == status)
+
+    if project_type:
+        filters.append(ProjectModel.project_type == project_type)
+
+    return filters
+
+
+# Общее количество проектов по фильтрам (с кэшированием на короткое время)
+async def count_projects(session, filter_key: tuple, count_query) -> int:
+    total = project_count_cache.get(filter_key)
+    if total is None:
+        total = await session.scalar(count_query) or 0
+        project_count_cache.set(filter_key, total)
+    return total
+
+
+# Непрозрачный курсор для keyset-пагинации: позиция последнего проекта на странице
+def encode_cursor(project) -> str:
+    position = {
+        "featured": int(project.status == "FEATURED"),
+        "created_at": project.created_at.isoformat() if project.created_at else None,
+        "id": project.id
+    }
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {
+            "featured": int(position["featured"]),
+            "created_at": datetime.fromisoformat(position["created_at"]),
+            "id": int(position["id"])
+        }
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Неверный курсор пагинации")
+
+
+# Страница проектов после курсора. Проекты FEATURED и остальные выбираются отдельными
+# запросами: признак фиксируется равенством, и каждый запрос идёт по индексу (created_at, id)
+async def fetch_after_cursor(session, query, position: dict, limit: int, split_featured: bool) -> list:
+    by_date = (ProjectModel.created_at.desc(), ProjectModel.id.desc())
+    after_cursor = tuple_(ProjectModel.created_at, ProjectModel.id) < tuple_(position["created_at"], position["id"])
+
+    if not split_featured:
+        result = await session.execute(query.where(after_cursor).order_by(*by_date).limit(limit))
+        return list(result.all())
+
+    projects = []
+    if position["featured"]:
+        result = await session.execute(
+            query.where(project_is_featured == 1, after_cursor).order_by(*by_date).limit(limit)
+        )
+        projects = list(result.all())
+
+    if len(projects) < limit:
+        rest = query.where(project_is_featured == 0)
+        if not position["featured"]:
+            rest = rest.where(after_cursor)
+        result = await session.execute(rest.order_by(*by_date).limit(limit - len(projects)))
+        projects.extend(result.all())
+
+    return projects
+
+
 # ============================================================================
 # ОСНОВНЫЕ ЭНДПОИНТЫ
 # ============================================================================
 
-@projects_router.post("/upload")
+# Создание проекта с уже сохранённым на диске файлом через очередь записи.
+# upload_id - сессия возобновляемой загрузки, которая удаляется в той же транзакции.
+# Файл переносится в хранилище только после фиксации: при ошибке записи он остаётся на прежнем месте
+async def create_project_with_file(current_user, title, description, project_type, file_name,
+                                   stored: StoredFile, upload_id: Optional[str] = None) -> dict:
+    current_time = datetime.utcnow()
+    file_path = None
+
+    async def create_project(session):
+        nonlocal file_path
+
+        # Повторное завершение той же сессии (файл уже перенесён в хранилище)
+        if upload_id is not None:
+            result = await session.execute(delete(UploadSessionModel).where(UploadSessionModel.id == upload_id))
+            if result.rowcount != 1:
+                raise HTTPException(status_code=404, detail="Сессия загрузки не найдена")
+
+        file_path = await attach_blob(session, stored)
+
+        project = ProjectModel(
+            user_id=current_user.id,
+            user_name=current_user.name,
+            user_email=current_user.email,
+            user_phone=current_user.phone_number,
+            title=title,
+            description=description,
+            project_type=project_type,
+            file_path=file_path,
+            file_name=file_name,
+            file_size=stored.size,
+            file_sha256=stored.sha256,
+            status="PENDING",
+            rating=0,
+            votes_count=0,
+            created_at=current_time,
+            updated_at=current_time
+        )
+
+        session.add(project)
+        await session.flush()
+        enqueue_processing(session, project.id)
+
+        return {
+            "message": "Проект загружен",
+            "project_id": project.id,
+            "project": project_to_response(project)
+        }
+
+    response = await write_queue.submit(create_project)
+    await run_in_threadpool(place_blob, stored, file_path)
+    project_count_cache.clear()
+    processing_queue.notify()
+
+    return response
+
+
+# Форма загрузки для документации OpenAPI: тело разбирается вручную (receive_upload), а не через Form/File
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["title", "project_type", "file"],
+                    "properties": {
+                        "title": {"type": "string"},
+                        "description": {"type": "string"},
+                        "project_type": {"type": "string"},
+                        "file": {"type": "string", "format": "binary"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+@projects_router.post("/upload", openapi_extra=UPLOAD_FORM_SCHEMA)
 async def upload_project(
-        session: SessionDep,
+        request: Request,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    fields, file_name, stored = await receive_upload(request)
+
+    try:
+        missing = [name for name in ("title", "project_type") if not fields.get(name)]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Не заполнены поля: {', '.join(missing)}")
+
+        return await create_project_with_file(
+            current_user, fields["title"], fields.get("description"), fields["project_type"], file_name, stored
+        )
+    except BaseException:
+        await run_in_threadpool(remove_file, stored.path)
+        raise
+
+
+# ============================================================================
+# ВОЗОБНОВЛЯЕМАЯ ЗАГРУЗКА
+# POST /uploads - создание сессии, PATCH /uploads/{id} - фрагмент по смещению Upload-Offset,
+# HEAD /uploads/{id} - текущее смещение, POST /uploads/{id}/finalize - создание проекта
+# ============================================================================
+
+# Сессия загрузки текущего пользователя (404 для чужих и несуществующих сессий)
+async def get_upload_session(session, upload_id: str, current_user) -> UploadSessionModel:
+    upload = await session.get(UploadSessionModel, upload_id)
+    if upload is None or upload.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Сессия загрузки не найдена")
+    return upload
+
+
+# Текущее смещение сессии; отсутствие частичного файла означает, что сессия уже удалена
+async def get_upload_offset(upload_id: str) -> int:
+    offset = await run_in_threadpool(part_offset, session_part_path(upload_id))
+    if offset is None:
+        raise HTTPException(status_code=404, detail="Сессия загрузки не найдена")
+    return offset
+
+
+def upload_headers(offset: int, upload: UploadSessionModel) -> dict:
+    return {
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(upload.file_size),
+        "Cache-Control": "no-store"
+    }
+
+
+@projects_router.post("/uploads", status_code=201)
+async def create_upload_session(
+        upload_data: UploadSessionCreateSchema,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    if upload_data.file_size > settings.UPLOAD_MAX_SIZE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер файла превышает {settings.UPLOAD_MAX_SIZE_BYTES} байт"
+        )
+
+    upload_id = str(uuid.uuid4())
+    await run_in_threadpool(create_part_file, upload_id)
+
+    async def create_session(session):
+        session.add(UploadSessionModel(
+            id=upload_id,
+            user_id=current_user.id,
+            file_name=upload_data.file_name,
+            file_size=upload_data.file_size,
+            created_at=datetime.utcnow()
+        ))
+
+    try:
+        await write_queue.submit(create_session)
+    except BaseException:
+        await run_in_threadpool(remove_file, session_part_path(upload_id))
+        raise
+
+    return {
+        "upload_id": upload_id,
+        "offset": 0,
+        "file_size": upload_data.file_size,
+        "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+        "expires_in": settings.UPLOAD_SESSION_TTL_SECONDS
+    }
+
+
+@projects_router.head("/uploads/{upload_id}")
+async def get_upload_status(
+        upload_id: str,
+        session: ReadSessionDep,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    upload = await get_upload_session(session, upload_id, current_user)
+    offset = await get_upload_offset(upload_id)
+    return Response(status_code=200, headers=upload_headers(offset, upload))
+
+
+@projects_router.patch("/uploads/{upload_id}")
+async def append_upload_chunk(
+        upload_id: str,
+        request: Request,
+        session: ReadSessionDep,
+        upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    upload = await get_upload_session(session, upload_id, current_user)
+    # Соединение с базой не нужно на время передачи фрагмента
+    await session.close()
+
+    offset = await get_upload_offset(upload_id)
+    if upload_offset != offset:
+        raise HTTPException(
+            status_code=409,
+            detail="Смещение не совпадает с размером загруженной части",
+            headers=upload_headers(offset, upload)
+        )
+
+    offset = await append_chunk(request.stream(), upload_id, offset, upload.file_size)
+    return Response(status_code=204, headers=upload_headers(offset, upload))
+
+
+@projects_router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(
+        upload_id: str,
+        session: ReadSessionDep,
         title: str = Form(...),
         description: str = Form(None),
         project_type: str = Form(...),
-        file: UploadFile = File(...),
         current_user: UserModel = Depends(require_admin_or_user)
 ):
-    file_content = await file.read()
-    file_size = len(file_content)
+    upload = await get_upload_session(session, upload_id, current_user)
+    await session.close()
 
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
+    offset = await get_upload_offset(upload_id)
+    if offset != upload.file_size:
+        raise HTTPException(
+            status_code=409,
+            detail="Файл загружен не полностью",
+            headers=upload_headers(offset, upload)
+        )
 
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
+    path = session_part_path(upload_id)
+    sha256, size = await run_in_threadpool(hash_file, path)
+    stored = StoredFile(path=path, size=size, sha256=sha256)
 
-    current_time = datetime.utcnow()
-
-    project = ProjectModel(
-        user_id=current_user.id,
-        user_name=current_user.name,
-        user_email=current_user.email,
-        user_phone=current_user.phone_number,
-        title=title,
-        description=description,
-        project_type=project_type,
-        file_path=file_path,
-        file_name=file.filename,
-        file_size=file_size,
-        status="PENDING",
-        rating=0,
-        votes_count=0,
-        created_at=current_time,
-        updated_at=current_time
+    return await create_project_with_file(
+        current_user, title, description, project_type, upload.file_name, stored, upload_id=upload_id
     )
 
-    session.add(project)
-    await session.commit()
-    await session.refresh(project)
 
-    return {
-        "message": "Проект загружен",
-        "project_id": project.id,
-        "project": project_to_response(project)
-    }
+@projects_router.delete("/uploads/{upload_id}")
+async def cancel_upload(
+        upload_id: str,
+        session: ReadSessionDep,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    await get_upload_session(session, upload_id, current_user)
+    await session.close()
+
+    async def delete_session(write_session):
+        await write_session.execute(delete(UploadSessionModel).where(UploadSessionModel.id == upload_id))
+
+    await write_queue.submit(delete_session)
+    await run_in_threadpool(remove_file, session_part_path(upload_id))
+
+    return {"message": "Загрузка отменена"}
 
 
 @projects_router.get("/")
 async def get_projects(
-        session: SessionDep,
+        session: ReadSessionDep,
         status: str = Query(None),
         project_type: str = Query(None),
         search: str = Query(None),
         limit: int = Query(100, ge=1, le=1000),
-        offset: int = Query(0, ge=0)
+        offset: int = Query(0, ge=0),
+        cursor: str = Query(None, description="Курсор следующей страницы (next_cursor)"),
+        include_total: bool = Query(True, description="Считать общее количество проектов")
 ):
-    query = select(ProjectModel)
+    status_filter = status.strip().upper() if status and status.strip() else None
+    type_filter = project_type.strip() if project_type and project_type.strip() else None
+    search_text = search.strip() if search and search.strip() else None
+    fts_query = build_fts_query(search_text) if search_text else None
+
+    # В строке поиска нет ни одного слова (например, только знаки препинания) - ничего не найдено
+    if search_text and fts_query is None:
+        return ORJSONResponse({
+            "projects": [],
+            "total": 0 if include_total else None,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": None
+        })
+
+    filters = project_filters(status_filter, type_filter)
+    query = select(*PROJECT_RESPONSE_COLUMNS).where(*filters)
+    count_query = select(func.count()).select_from(ProjectModel).where(*filters)
+
+    # Поиск по полнотекстовому индексу FTS5 с ранжированием bm25
+    search_index = None
+    if fts_query:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Курсор не поддерживается вместе с поиском")
+        search_index = project_search_subquery(fts_query)
+        query = query.join(search_index, search_index.c.project_id == ProjectModel.id)
+        count_query = count_query.join(search_index, search_index.c.project_id == ProjectModel.id)
+
+    total_count = None
+    if include_total:
+        total_count = await count_projects(session, (status_filter, type_filter, fts_query), count_query)
+
+    # При фильтре по статусу признак FEATURED постоянен, поэтому сортировка только по дате и id
+    split_featured = status_filter is None
+    order = (project_is_featured.desc(),) if split_featured else ()
+
+    if search_index is not None:
+        query = query.order_by(*order, search_index.c.rank, ProjectModel.id.desc())
+        result = await session.execute(query.offset(offset).limit(limit))
+        projects = result.all()
+    elif cursor:
+        projects = await fetch_after_cursor(session, query, decode_cursor(cursor), limit, split_featured)
+    else:
+        query = query.order_by(*order, ProjectModel.created_at.desc(), ProjectModel.id.desc())
+        result = await session.execute(query.offset(offset).limit(limit))
+        projects = result.all()
+
+    # Для результатов поиска порядок задаётся релевантностью, поэтому курсор не выдаётся
+    next_cursor = None
+    if search_index is None and len(projects) == limit:
+        next_cursor = encode_cursor(projects[-1])
+
+    # Ответ сериализуется orjson напрямую, минуя jsonable_encoder
+    return ORJSONResponse({
+        "projects": [project_row_to_response(p) for p in projects],
+        "total": total_count,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor
+    })
+
+
+# Потоковая выгрузка всех проектов в NDJSON (только для администратора).
+# Объявлена до /{project_id}, иначе путь /export попадёт в него
+@projects_router.get("/export")
+async def export_projects(
+        current_user: UserModel = Depends(require_admin_or_user),
+        after_id: int = Query(None, ge=0, description="Продолжить выгрузку после проекта с этим id"),
+        gzip: bool = Query(False, description="Сжать выгрузку gzip")
+):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Только для администратора")
 
-    if status and status.strip():
-        status_filter = status.strip().upper()
-        query = query.where(ProjectModel.status == status_filter)
+    return export_response(
+        select(*PROJECT_RESPONSE_COLUMNS),
+        ProjectModel.id,
+        project_row_to_response,
+        "projects",
+        after_id,
+        gzip
+    )
 
-    if project_type and project_type.strip():
-        query = query.where(ProjectModel.project_type == project_type.strip())
 
-    if search and search.strip():
-        search_term = f"%{search.strip()}%"
-        query = query.where(
-            or_(
-                ProjectModel.title.ilike(search_term),
-                ProjectModel.description.ilike(search_term)
-            )
-        )
+@projects_router.get("/{project_id}")
+async def get_project(project_id: int, session: ReadSessionDep):
+    result = await session.execute(
+        select(ProjectModel).where(ProjectModel.id == project_id)
+    )
+    project = result.scalar_one_or_none()
 
-    count_query = select(func.count()).select_from(ProjectModel)
+    if not project:
+        raise HTTPException(status_code=404, detail="Проект не найден")
 
-    if status and status.strip():
-        count_query = count_query.where(ProjectModel.status == status.strip().upper())
+    return project_to_response(project)
 
-    if project_type and project_type.strip():
-        count_query = count_query.where(ProjectModel.project_type == project_type.strip())
 
-    if search and search.strip():
-        search_term = f"%{search.strip()}%"
-        count_query = count_query.where(
-            or_(
-                ProjectModel.title.ilike(search_term),
-                ProjectModel.description.ilike(search_term)
-            )
-        )
+# Скачивание файла проекта. Файл отдаётся FileResponse: Range-запросы (в том числе If-Range),
+# а при поддержке сервером расширения ASGI pathsend - передача без копирования через sendfile.
+# ETag строится из SHA-256 содержимого, поэтому одинаков для всех копий и не зависит от mtime
+@projects_router.get("/{project_id}/file")
+async def download_project_file(
+        project_id: int,
+        request: Request,
+        session: ReadSessionDep,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
+    result = await session.execute(
+        select(ProjectModel).where(ProjectModel.id == project_id)
+    )
+    project = result.scalar_one_or_none()
 
-    total_count = await session.scalar(count_query) or 0
+    if not project:
+        raise HTTPException(status_code=404, detail="Проект не найден")
 
-    query = query.order_by(
-        func.nullif(ProjectModel.status == "FEATURED", False).desc(),
-        ProjectModel.created_at.desc()
-    ).offset(offset).limit(limit)
+    check_user_access(project, current_user)
 
-    result = await session.execute(query)
-    projects = result.scalars().all()
+    try:
+        stat_result = await run_in_threadpool(os.stat, project.file_path or "")
+    except OSError:
+        raise HTTPException(status_code=404, detail="Файл не найден")
 
-    return {
-        "projects": [project_to_response(p) for p in projects],
-        "total": total_count,
-        "limit": limit,
-        "offset": offset
+    headers = {
+        "Content-Disposition": content_disposition(project.file_name),
+        "Cache-Control": "private, no-cache"
     }
+    if project.file_sha256:
+        headers["ETag"] = f'"{project.file_sha256}"'
+
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers={
+                "ETag": headers["ETag"],
+                "Cache-Control": headers["Cache-Control"]
+            })
+
+    media_type = mimetypes.guess_type(project.file_name or "")[0] or "application/octet-stream"
+
+    return FileResponse(
+        project.file_path,
+        headers=headers,
+        media_type=media_type,
+        stat_result=stat_result
+    )
 
 
-@projects_router.get("/{project_id}")
-async def get_project(project_id: int, session: SessionDep):
+# Состояние фоновой обработки файла проекта (последняя задача) и её результаты
+@projects_router.get("/{project_id}/processing")
+async def get_project_processing(
+        project_id: int,
+        session: ReadSessionDep,
+        current_user: UserModel = Depends(require_admin_or_user)
+):
     result = await session.execute(
         select(ProjectModel).where(ProjectModel.id == project_id)
     )
@@ -173,19 +604,68 @@ async def get_project(project_id: int, session: SessionDep):
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
 
-    return project_to_response(project)
+    check_user_access(project, current_user)
+
+    job = (await session.execute(
+        select(ProcessingJobModel)
+        .where(ProcessingJobModel.project_id == project_id)
+        .order_by(ProcessingJobModel.id.desc())
+        .limit(1)
+    )).scalar_one_or_none()
+
+    if job is None:
+        return {"project_id": project_id, "status": "not_queued"}
+
+    response = {
+        "project_id": project_id,
+        "status": job.status.lower(),
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+    if job.status == "DONE":
+        response["result"] = {
+            "mime_type": project.file_mime_type,
+            "page_count": project.file_page_count,
+            "archive_entries": project.file_archive_entries,
+            "text_excerpt": project.file_text_excerpt
+        }
+
+    return response
 
 
 @projects_router.get("/my/projects")
 async def get_my_projects(
-        session: SessionDep,
-        current_user: UserModel = Depends(require_admin_or_user)
+        session: ReadSessionDep,
+        current_user: UserModel = Depends(require_admin_or_user),
+        limit: int = Query(None, ge=1, le=1000),
+        cursor: str = Query(None, description="Курсор следующей страницы (next_cursor)")
 ):
-    query = select(ProjectModel).where(ProjectModel.user_id == current_user.id)
-    result = await session.execute(query.order_by(ProjectModel.created_at.desc()))
-    projects = result.scalars().all()
+    query = select(*PROJECT_RESPONSE_COLUMNS).where(ProjectModel.user_id == current_user.id)
+    query = query.order_by(ProjectModel.created_at.desc(), ProjectModel.id.desc())
 
-    return [project_to_response(p) for p in projects]
+    # Без limit и cursor - прежний формат ответа (полный список) для старых клиентов
+    if limit is None and cursor is None:
+        result = await session.execute(query)
+        return ORJSONResponse([project_row_to_response(p) for p in result.all()])
+
+    limit = limit or 100
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.where(
+            tuple_(ProjectModel.created_at, ProjectModel.id) < tuple_(position["created_at"], position["id"])
+        )
+
+    result = await session.execute(query.limit(limit))
+    projects = result.all()
+
+    return ORJSONResponse({
+        "projects": [project_row_to_response(p) for p in projects],
+        "limit": limit,
+        "next_cursor": encode_cursor(projects[-1]) if len(projects) == limit else None
+    })
 
 
 @projects_router.put("/{project_id}")
@@ -214,6 +694,7 @@ async def update_project(
     project.updated_at = datetime.utcnow()
 
     await session.commit()
+    project_count_cache.clear()
 
     return {
         "message": "Проект обновлен",
@@ -223,7 +704,6 @@ async def update_project(
 
 @projects_router.patch("/{project_id}/status")
 async def update_status(
-        session: SessionDep,
         project_id: int,
         status_data: ProjectStatusUpdateSchema,  # Используем Pydantic схему
         current_user: UserModel = Depends(require_admin_or_user)
@@ -231,29 +711,32 @@ async def update_status(
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Только для администратора")
 
-    result = await session.execute(
-        select(ProjectModel).where(ProjectModel.id == project_id)
-    )
-    project = result.scalar_one_or_none()
+    async def apply_status(session):
+        result = await session.execute(
+            select(ProjectModel).where(ProjectModel.id == project_id)
+        )
+        project = result.scalar_one_or_none()
 
-    if not project:
-        raise HTTPException(status_code=404, detail="Проект не найден")
+        if not project:
+            raise HTTPException(status_code=404, detail="Проект не найден")
 
-    project.status = status_data.status.upper()
-    project.updated_at = datetime.utcnow()
+        project.status = status_data.status.upper()
+        project.updated_at = datetime.utcnow()
 
-    await session.commit()
+        return {
+            "message": "Статус обновлен",
+            "project": project_to_response(project)
+        }
 
-    return {
-        "message": "Статус обновлен",
-        "project": project_to_response(project)
-    }
+    response = await write_queue.submit(apply_status)
+    project_count_cache.clear()
+
+    return response
 
 
 # Альтернативный вариант эндпоинта (через JSON тело)
 @projects_router.patch("/{project_id}/status2")
 async def update_status_json(
-        session: SessionDep,
         project_id: int,
         status_data: dict = Body(..., description="Данные для обновления статуса"),
         current_user: UserModel = Depends(require_admin_or_user)
@@ -261,36 +744,40 @@ async def update_status_json(
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Только для администратора")
 
-    result = await session.execute(
-        select(ProjectModel).where(ProjectModel.id == project_id)
-    )
-    project = result.scalar_one_or_none()
+    async def apply_status(session):
+        result = await session.execute(
+            select(ProjectModel).where(ProjectModel.id == project_id)
+        )
+        project = result.scalar_one_or_none()
 
-    if not project:
-        raise HTTPException(status_code=404, detail="Проект не найден")
+        if not project:
+            raise HTTPException(status_code=404, detail="Проект не найден")
 
-    status = status_data.get("status")
-    if not status:
-        raise HTTPException(status_code=400, detail="Статус не указан")
+        status = status_data.get("status")
+        if not status:
+            raise HTTPException(status_code=400, detail="Статус не указан")
 
-    valid_statuses = ["PENDING", "APPROVED", "REJECTED", "FEATURED"]
-    status_upper = status.strip().upper()
+        valid_statuses = ["PENDING", "APPROVED", "REJECTED", "FEATURED"]
+        status_upper = status.strip().upper()
 
-    if status_upper not in valid_statuses:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Неверный статус. Допустимые: {', '.join(valid_statuses)}"
-        )
+        if status_upper not in valid_statuses:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неверный статус. Допустимые: {', '.join(valid_statuses)}"
+            )
 
-    project.status = status_upper
-    project.updated_at = datetime.utcnow()
+        project.status = status_upper
+        project.updated_at = datetime.utcnow()
 
-    await session.commit()
+        return {
+            "message": "Статус обновлен",
+            "project": project_to_response(project)
+        }
 
-    return {
-        "message": "Статус обновлен",
-        "project": project_to_response(project)
-    }
+    response = await write_queue.submit(apply_status)
+    project_count_cache.clear()
+
+    return response
 
 
 @projects_router.delete("/{project_id}")
@@ -309,107 +796,133 @@ async def delete_project(
 
     check_user_access(project, current_user)
 
-    try:
-        if project.file_path and os.path.exists(project.file_path):
-            os.remove(project.file_path)
-    except Exception as e:
-        print(f"Ошибка при удалении файла: {e}")
-
-    await session.delete(project)
+    # Файл удаляется в фоне и только вместе с последним проектом, который на него ссылается
+    paths = await delete_projects(session, [project])
     await session.commit()
+    project_count_cache.clear()
+    deletion_queue.schedule(paths)
 
     return {"message": "Проект удален"}
 
 
 @projects_router.post("/{project_id}/vote")
 async def vote_for_project(
-        session: SessionDep,
+        read_session: ReadSessionDep,
         project_id: int,
         vote: int = Query(..., ge=-1, le=1),
         current_user: UserModel = Depends(require_admin_or_user)
 ):
-    result = await session.execute(
-        select(ProjectModel).where(ProjectModel.id == project_id)
-    )
-    project = result.scalar_one_or_none()
-
-    if not project:
-        raise HTTPException(status_code=404, detail="Проект не найден")
-
-    if project.status not in ["APPROVED", "FEATURED"]:
+    if vote not in [-1, 0, 1]:
         raise HTTPException(
             status_code=400,
-            detail="Можно голосовать только за одобренные проекты"
+            detail="Голос должен быть -1, 0 или 1"
         )
 
-    if project.user_id == current_user.id:
-        raise HTTPException(
-            status_code=400,
-            detail="Нельзя голосовать за свой проект"
+    # Отложенная запись: голоса за проекты FEATURED принимаются в буфер и записываются пачками.
+    # Ошибочные голоса не буферизуются и получают ответ из обычного пути записи ниже.
+    # Счётчики и голос в базе читаются заново, если во время чтения шёл сброс буфера
+    if vote_buffer.enabled:
+        while True:
+            marker = vote_buffer.read_marker()
+            result = await read_session.execute(
+                select(ProjectModel.status, ProjectModel.user_id, ProjectModel.rating, ProjectModel.votes_count)
+                .where(ProjectModel.id == project_id)
+            )
+            project = result.one_or_none()
+            buffered = project and project.status == "FEATURED" and project.user_id != current_user.id
+            if buffered:
+                stored_vote = await current_vote(read_session, project_id, current_user.id)
+            if not buffered or vote_buffer.unchanged_since(marker):
+                break
+            await vote_buffer.wait_flush()
+
+        if buffered:
+            previous = vote_buffer.pending_vote(project_id, current_user.id)
+            if previous is None:
+                previous = stored_vote
+            vote_buffer.add(project_id, current_user.id, vote, previous)
+
+            rating, votes_count = vote_buffer.merge(project_id, project.rating, project.votes_count)
+            return {
+                "message": "Голос учтен",
+                "rating": rating,
+                "votes_count": votes_count
+            }
+
+        # Более ранний голос пользователя из буфера должен попасть в базу раньше текущего
+        if vote_buffer.pending_vote(project_id, current_user.id) is not None:
+            await vote_buffer.flush()
+
+    async def register_vote(session):
+        result = await session.execute(
+            select(ProjectModel.status, ProjectModel.user_id).where(ProjectModel.id == project_id)
         )
+        project = result.one_or_none()
 
-    if vote not in [-1, 0, 1]:
-        raise HTTPException(
-            status_code=400,
-            detail="Голос должен быть -1, 0 или 1"
-        )
+        if not project:
+            raise HTTPException(status_code=404, detail="Проект не найден")
 
-    current_rating = project.rating or 0
-    current_votes = project.votes_count or 0
+        if project.status not in ["APPROVED", "FEATURED"]:
+            raise HTTPException(
+                status_code=400,
+                detail="Можно голосовать только за одобренные проекты"
+            )
 
-    if vote == 0:
-        project.votes_count = max(0, current_votes - 1)
-    else:
-        project.rating = current_rating + vote
-        project.votes_count = current_votes + 1
+        if project.user_id == current_user.id:
+            raise HTTPException(
+                status_code=400,
+                detail="Нельзя голосовать за свой проект"
+            )
 
-    project.updated_at = datetime.utcnow()
+        rating, votes_count = await apply_vote(session, project_id, current_user.id, vote)
+        rating, votes_count = vote_buffer.merge(project_id, rating, votes_count)
 
-    await session.commit()
+        return {
+            "message": "Голос учтен",
+            "rating": rating,
+            "votes_count": votes_count
+        }
+
+    return await write_queue.submit(register_vote)
+
+
+@projects_router.get("/stats/summary")
+async def get_stats(session: ReadSessionDep):
+    # Статистика читается из сводной таблицы project_stats, которую обновляют триггеры
+    result = await session.execute(project_stats_query())
+    return stats_response(result.all())
+
+
+# Проверка сводной статистики и её пересчёт с нуля (только для администратора)
+@projects_router.post("/stats/rebuild")
+async def rebuild_stats(current_user: UserModel = Depends(require_admin_or_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Только для администратора")
+
+    async def rebuild(session):
+        connection = await session.connection()
+        drift = await connection.run_sync(find_project_stats_drift)
+        await connection.run_sync(rebuild_project_stats)
+        return drift
+
+    drift = await write_queue.submit(rebuild)
 
     return {
-        "message": "Голос учтен",
-        "rating": project.rating,
-        "votes_count": project.votes_count
+        "message": "Статистика пересчитана",
+        "consistent": not drift,
+        "drift": drift
     }
 
 
-@projects_router.get("/stats/summary")
-async def get_stats(session: SessionDep):
-    total = await session.scalar(select(func.count(ProjectModel.id))) or 0
-
-    pending = await session.scalar(
-        select(func.count()).where(ProjectModel.status == "PENDING")
-    ) or 0
-    approved = await session.scalar(
-        select(func.count()).where(ProjectModel.status == "APPROVED")
-    ) or 0
-    rejected = await session.scalar(
-        select(func.count()).where(ProjectModel.status == "REJECTED")
-    ) or 0
-    featured = await session.scalar(
-        select(func.count()).where(ProjectModel.status == "FEATURED")
-    ) or 0
-
-    total_rating = await session.scalar(select(func.sum(ProjectModel.rating))) or 0
-    total_votes = await session.scalar(select(func.sum(ProjectModel.votes_count))) or 0
-
-    types_result = await session.execute(
-        select(ProjectModel.project_type, func.count(ProjectModel.id))
-        .group_by(ProjectModel.project_type)
-    )
-    type_distribution = {str(t): c for t, c in types_result.all() if t}
+# Немедленный поиск и удаление файлов, на которые не ссылается ни один проект (только администратор)
+@projects_router.post("/storage/sweep")
+async def sweep_storage(current_user: UserModel = Depends(require_admin_or_user)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Только для администратора")
+
+    report = await orphan_sweeper.sweep()
 
     return {
-        "total_projects": total,
-        "status_distribution": {
-            "pending": pending,
-            "approved": approved,
-            "rejected": rejected,
-            "featured": featured
-        },
-        "type_distribution": type_distribution,
-        "total_rating": total_rating,
-        "total_votes": total_votes,
-        "average_rating": round(total_rating / total_votes, 2) if total_votes > 0 else 0
-    }
\ No newline at end of file
+        "message": "Неиспользуемые файлы удалены",
+        **report
+    }
@@ -25,6 +25,12 @@ class ProjectCreateSchema(BaseModel):
     project_type: ProjectType
 
 
+class UploadSessionCreateSchema(BaseModel):
+    # Схема для создания сессии возобновляемой загрузки
+    file_name: str = Field(..., min_length=1, max_length=255)
+    file_size: int = Field(..., ge=0)
+
+
 class ProjectUpdateSchema(BaseModel):
     # Схема для обновления проекта
     title: Optional[str] = Field(None, min_length=1, max_length=200)
@@ -0,0 +1,97 @@
+import asyncio
+import re
+from typing import Optional
+
+from sqlalchemy import Connection, select, literal_column, text
+
+# Полнотекстовый индекс FTS5 по названию и описанию проектов (external content над таблицей projects).
+# unicode61 корректно приводит к нижнему регистру кириллицу, в отличие от ILIKE в SQLite
+PROJECTS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5("
+    "title, description, content='projects', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+# remove_diacritics действует только на латиницу, поэтому "ё" приводится к "е" явно
+# (одинаково при индексации и в поисковом запросе)
+def fold_sql(expression: str) -> str:
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def fold_text(value: str) -> str:
+    return value.replace("ё", "е").replace("Ё", "Е")
+
+
+_NEW_VALUES = f"new.id, {fold_sql('new.title')}, {fold_sql('new.description')}"
+_OLD_VALUES = f"old.id, {fold_sql('old.title')}, {fold_sql('old.description')}"
+
+# Триггеры синхронизации индекса с таблицей projects
+PROJECTS_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS projects_fts_ai AFTER INSERT ON projects BEGIN "
+    f"INSERT INTO projects_fts(rowid, title, description) VALUES ({_NEW_VALUES}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS projects_fts_ad AFTER DELETE ON projects BEGIN "
+    f"INSERT INTO projects_fts(projects_fts, rowid, title, description) VALUES ('delete', {_OLD_VALUES}); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS projects_fts_au AFTER UPDATE OF title, description ON projects BEGIN "
+    f"INSERT INTO projects_fts(projects_fts, rowid, title, description) VALUES ('delete', {_OLD_VALUES}); "
+    f"INSERT INTO projects_fts(rowid, title, description) VALUES ({_NEW_VALUES}); "
+    "END",
+)
+
+# Вес совпадений в названии относительно описания для bm25
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+# Создание индекса и триггеров (если их нет) и полное перестроение индекса по текущим данным
+def create_project_search_index(connection: Connection) -> None:
+    connection.exec_driver_sql(PROJECTS_FTS_DDL)
+    for trigger in PROJECTS_FTS_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+    rebuild_project_search_index(connection)
+
+
+# Встроенная команда 'rebuild' читает текст без приведения "ё", поэтому индекс заполняется заново вручную
+def rebuild_project_search_index(connection: Connection) -> None:
+    connection.exec_driver_sql("INSERT INTO projects_fts(projects_fts) VALUES ('delete-all')")
+    connection.exec_driver_sql(
+        "INSERT INTO projects_fts(rowid, title, description) "
+        f"SELECT id, {fold_sql('title')}, {fold_sql('description')} FROM projects"
+    )
+
+
+# Преобразование пользовательской строки в запрос FTS5: все слова обязательны,
+# каждое ищется по префиксу ("ракет" найдёт "ракета"). Спецсимволы FTS5 отбрасываются
+def build_fts_query(search: str) -> Optional[str]:
+    words = re.findall(r"\w+", fold_text(search))
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+# Подзапрос (project_id, rank) по полнотекстовому индексу; меньший rank - более релевантный проект
+def project_search_subquery(fts_query: str):
+    return (
+        select(
+            literal_column("projects_fts.rowid").label("project_id"),
+            literal_column(f"bm25(projects_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT})").label("rank")
+        )
+        .select_from(text("projects_fts"))
+        .where(text("projects_fts MATCH :fts_query").bindparams(fts_query=fts_query))
+        .subquery("project_search")
+    )
+
+
+# Перестроение индекса для существующей базы: python -m app.project.search
+async def rebuild() -> None:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(create_project_search_index)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,137 @@
+import asyncio
+
+from sqlalchemy import Connection, select, func
+
+from app.db.models import ProjectModel, ProjectStatsModel
+
+# Прибавление проекта к строке сводной статистики (new) и вычитание из неё (old)
+_ADD_NEW = (
+    "INSERT INTO project_stats(status, project_type, projects_count, rating_sum, votes_sum) "
+    "VALUES (new.status, new.project_type, 1, coalesce(new.rating, 0), coalesce(new.votes_count, 0)) "
+    "ON CONFLICT(status, project_type) DO UPDATE SET "
+    "projects_count = projects_count + 1, "
+    "rating_sum = rating_sum + excluded.rating_sum, "
+    "votes_sum = votes_sum + excluded.votes_sum; "
+)
+_SUBTRACT_OLD = (
+    "UPDATE project_stats SET "
+    "projects_count = projects_count - 1, "
+    "rating_sum = rating_sum - coalesce(old.rating, 0), "
+    "votes_sum = votes_sum - coalesce(old.votes_count, 0) "
+    "WHERE status = old.status AND project_type = old.project_type; "
+    "DELETE FROM project_stats "
+    "WHERE status = old.status AND project_type = old.project_type AND projects_count <= 0; "
+)
+
+# Триггеры инкрементального обновления project_stats при загрузке, смене статуса, голосовании и удалении
+PROJECT_STATS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS project_stats_ai AFTER INSERT ON projects BEGIN {_ADD_NEW}END",
+    f"CREATE TRIGGER IF NOT EXISTS project_stats_ad AFTER DELETE ON projects BEGIN {_SUBTRACT_OLD}END",
+    "CREATE TRIGGER IF NOT EXISTS project_stats_au "
+    f"AFTER UPDATE OF status, project_type, rating, votes_count ON projects BEGIN {_SUBTRACT_OLD}{_ADD_NEW}END",
+)
+
+STATUSES = ("PENDING", "APPROVED", "REJECTED", "FEATURED")
+
+
+# Агрегаты по таблице projects за один проход (источник истины для сводной таблицы)
+def aggregate_projects_query():
+    return (
+        select(
+            ProjectModel.status,
+            ProjectModel.project_type,
+            func.count().label("projects_count"),
+            func.coalesce(func.sum(func.coalesce(ProjectModel.rating, 0)), 0).label("rating_sum"),
+            func.coalesce(func.sum(func.coalesce(ProjectModel.votes_count, 0)), 0).label("votes_sum")
+        )
+        .group_by(ProjectModel.status, ProjectModel.project_type)
+    )
+
+
+# Строки сводной таблицы
+def project_stats_query():
+    return select(
+        ProjectStatsModel.status,
+        ProjectStatsModel.project_type,
+        ProjectStatsModel.projects_count,
+        ProjectStatsModel.rating_sum,
+        ProjectStatsModel.votes_sum
+    ).where(ProjectStatsModel.projects_count > 0)
+
+
+# Ответ эндпоинта статистики из строк (status, project_type, projects_count, rating_sum, votes_sum)
+def stats_response(rows) -> dict:
+    total = 0
+    total_rating = 0
+    total_votes = 0
+    status_distribution = {status.lower(): 0 for status in STATUSES}
+    type_distribution = {}
+
+    for status, project_type, projects_count, rating_sum, votes_sum in rows:
+        total += projects_count
+        total_rating += rating_sum
+        total_votes += votes_sum
+        if status in STATUSES:
+            status_distribution[status.lower()] += projects_count
+        if project_type:
+            type_distribution[str(project_type)] = type_distribution.get(str(project_type), 0) + projects_count
+
+    return {
+        "total_projects": total,
+        "status_distribution": status_distribution,
+        "type_distribution": type_distribution,
+        "total_rating": total_rating,
+        "total_votes": total_votes,
+        "average_rating": round(total_rating / total_votes, 2) if total_votes > 0 else 0
+    }
+
+
+# Сравнение сводной таблицы с пересчётом по projects; возвращает список расхождений
+def find_project_stats_drift(connection: Connection) -> list:
+    expected = {(row[0], row[1]): tuple(row[2:]) for row in connection.execute(aggregate_projects_query())}
+    actual = {(row[0], row[1]): tuple(row[2:]) for row in connection.execute(project_stats_query())}
+
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        if expected.get(key) != actual.get(key):
+            drift.append({
+                "status": key[0],
+                "project_type": key[1],
+                "expected": expected.get(key),
+                "actual": actual.get(key)
+            })
+    return drift
+
+
+# Полный пересчёт сводной таблицы с нуля
+def rebuild_project_stats(connection: Connection) -> None:
+    connection.exec_driver_sql("DELETE FROM project_stats")
+    connection.execute(
+        ProjectStatsModel.__table__.insert().from_select(
+            ["status", "project_type", "projects_count", "rating_sum", "votes_sum"],
+            aggregate_projects_query()
+        )
+    )
+
+
+# Создание триггеров (если их нет) и заполнение сводной таблицы
+def create_project_stats_triggers(connection: Connection) -> None:
+    for trigger in PROJECT_STATS_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+    rebuild_project_stats(connection)
+
+
+# Проверка и пересчёт для существующей базы: python -m app.project.stats
+async def rebuild() -> None:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        drift = await conn.run_sync(find_project_stats_drift)
+        await conn.run_sync(rebuild_project_stats)
+    await async_engine.dispose()
+
+    print(f"Расхождений в project_stats: {len(drift)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import unicodedata
+from typing import NamedTuple, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+from sqlalchemy import Connection, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.db.models import FileBlobModel
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads/projects"
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+
+# Загруженный файл: путь, размер и SHA-256 содержимого
+class StoredFile(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+# Путь файла в хранилище по SHA-256: uploads/projects/ab/abcdef...
+# (подкаталог по первым двум символам, чтобы не держать все файлы в одном каталоге)
+def blob_path(digest: str) -> str:
+    return os.path.join(UPLOAD_DIR, digest[:2], digest)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Размер файла превышает {settings.UPLOAD_MAX_SIZE_BYTES} байт"
+    )
+
+
+def _bad_form(detail: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Некорректная форма загрузки: {detail}")
+
+
+# Разбор тела multipart/form-data по мере поступления (python-multipart, как в Starlette). Файл из поля
+# file_field пишется сразу во временный файл в UPLOAD_DIR с подсчётом размера и SHA-256, текстовые поля
+# собираются в память с ограничением размера. Данные файла из обратных вызовов парсера копятся
+# и записываются в отдельном потоке после каждого фрагмента тела
+class _UploadParser:
+    def __init__(self, file_field: str, charset: str):
+        self.file_field = file_field
+        self.charset = charset
+        self.fields = {}
+        self.filename = None
+        self.temp_path = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._file = None
+        self.pending = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._name = None
+        self._data = None
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._name = None
+        self._data = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise _bad_form("у части формы нет имени")
+        self._name = options[b"name"].decode(self.charset, "replace")
+
+        if b"filename" not in options:
+            if len(self.fields) >= settings.UPLOAD_FORM_MAX_FIELDS:
+                raise _bad_form("слишком много полей")
+            self._data = bytearray()
+        elif self._name != self.file_field or self._file is not None:
+            raise _bad_form(f"файл ожидается только в поле {self.file_field}")
+        else:
+            self.filename = options[b"filename"].decode(self.charset, "replace")
+            fd, self.temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+            self._file = os.fdopen(fd, "wb")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._data is not None:
+            if len(self._data) + len(chunk) > settings.UPLOAD_FORM_FIELD_MAX_BYTES:
+                raise _bad_form(f"поле {self._name} длиннее {settings.UPLOAD_FORM_FIELD_MAX_BYTES} байт")
+            self._data += chunk
+            return
+
+        self.size += len(chunk)
+        # Лимит проверяется до записи: тело дальше не читается
+        if self.size > settings.UPLOAD_MAX_SIZE_BYTES:
+            raise _too_large()
+        self.pending.append(chunk)
+
+    def on_part_end(self) -> None:
+        if self._data is not None:
+            self.fields[self._name] = self._data.decode(self.charset, "replace")
+            self._data = None
+
+    # Запись накопленных данных файла (в отдельном потоке)
+    def flush(self) -> None:
+        for chunk in self.pending:
+            self._file.write(chunk)
+            self.digest.update(chunk)
+        self.pending.clear()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished
+        }
+
+
+# Приём загрузки multipart/form-data прямо из потока запроса, без предварительного сохранения тела
+# Starlette во временный файл: размер проверяется по Content-Length до чтения и по мере поступления
+# данных (413 сразу при превышении UPLOAD_MAX_SIZE_BYTES), файл пишется один раз - во временный файл
+# в UPLOAD_DIR, который затем передаётся в attach_blob. Потребление памяти не зависит от размера файла.
+# Возвращает (текстовые поля формы, имя файла, StoredFile)
+async def receive_upload(request: Request, file_field: str = "file") -> tuple:
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=415, detail="Ожидается multipart/form-data")
+
+    form_limit = settings.UPLOAD_FORM_FIELD_MAX_BYTES * settings.UPLOAD_FORM_MAX_FIELDS
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.UPLOAD_MAX_SIZE_BYTES + form_limit:
+        raise _too_large()
+
+    charset = options.get(b"charset", b"utf-8").decode("latin-1")
+    upload = _UploadParser(file_field, charset)
+    parser = MultipartParser(options[b"boundary"], upload.callbacks())
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if upload.pending:
+                    await run_in_threadpool(upload.flush)
+            parser.finalize()
+        except MultipartParseError as e:
+            raise _bad_form(str(e))
+        finally:
+            await run_in_threadpool(upload.close)
+
+        if upload.temp_path is None:
+            raise _bad_form(f"нет файла в поле {file_field}")
+    except BaseException:
+        if upload.temp_path is not None:
+            await run_in_threadpool(remove_file, upload.temp_path)
+        raise
+
+    stored = StoredFile(path=upload.temp_path, size=upload.size, sha256=upload.digest.hexdigest())
+    return upload.fields, upload.filename, stored
+
+
+# Перемещение файла в хранилище (атомарное переименование в пределах UPLOAD_DIR)
+def _place_blob(temp_path: str, target: str) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(temp_path, target)
+
+
+# Регистрация загруженного файла в хранилище в транзакции писателя: новая запись file_blobs или
+# увеличение счётчика ссылок, если файл с таким SHA-256 уже есть. Файловая система здесь не меняется:
+# до фиксации транзакции временный файл остаётся на месте (при откате загрузку можно повторить),
+# а после фиксации вызывающий код переносит его через place_blob. Возвращает путь файла в хранилище
+async def attach_blob(session: AsyncSession, stored: StoredFile) -> str:
+    result = await session.execute(
+        update(FileBlobModel)
+        .where(FileBlobModel.sha256 == stored.sha256)
+        .values(ref_count=FileBlobModel.ref_count + 1)
+        .returning(FileBlobModel.path)
+        .execution_options(synchronize_session=False)
+    )
+    existing_path = result.scalar_one_or_none()
+    if existing_path is not None:
+        return existing_path
+
+    target = blob_path(stored.sha256)
+    session.add(FileBlobModel(sha256=stored.sha256, path=target, size=stored.size, ref_count=1))
+    await session.flush()
+    return target
+
+
+# Перенос временного файла в хранилище после фиксации attach_blob. Если файл уже на месте,
+# временный удаляется; если пропал с диска (например, после сбоя при удалении) - восстанавливается из загрузки
+def place_blob(stored: StoredFile, target: str) -> None:
+    if os.path.exists(target):
+        remove_file(stored.path)
+    else:
+        _place_blob(stored.path, target)
+
+
+# Освобождение ссылки на файл при удалении проекта. Когда на файл больше не ссылается ни один проект,
+# запись удаляется и возвращается путь файла для отложенного удаления (app.project.files)
+async def release_blob(session: AsyncSession, digest: str) -> Optional[str]:
+    result = await session.execute(
+        update(FileBlobModel)
+        .where(FileBlobModel.sha256 == digest)
+        .values(ref_count=FileBlobModel.ref_count - 1)
+        .returning(FileBlobModel.ref_count, FileBlobModel.path)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None or row.ref_count > 0:
+        return None
+
+    await session.execute(delete(FileBlobModel).where(FileBlobModel.sha256 == digest))
+    return row.path
+
+
+# Удаление файла, если он существует
+def remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Заголовок Content-Disposition для скачивания: ASCII-вариант имени для старых клиентов
+# и полное имя в UTF-8 по RFC 6266 / RFC 5987
+def content_disposition(filename: Optional[str]) -> str:
+    if not filename:
+        return "attachment"
+
+    fallback = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode()
+    fallback = "".join(ch if ch.isprintable() and ch not in '"\\' else "_" for ch in fallback)
+    stem, ext = os.path.splitext(fallback)
+    if not any(ch.isalnum() for ch in stem):
+        fallback = f"file{ext}"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+# SHA-256 и размер файла на диске (чтение блоками)
+def hash_file(path: str) -> tuple:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+# Копия файла в хранилище без изменения исходного: жёсткая ссылка или (на другой файловой системе)
+# копирование через временный файл, чтобы в хранилище не оказался недописанный файл
+def _link_blob(path: str, target: str) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(path, target)
+        return
+    except OSError:
+        pass
+
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    os.close(fd)
+    try:
+        shutil.copyfile(path, temp_path)
+        _place_blob(temp_path, target)
+    except BaseException:
+        remove_file(temp_path)
+        raise
+
+
+# Перенос существующих загрузок в хранилище по SHA-256: одинаковые файлы сводятся к одному,
+# пути проектов обновляются, таблица file_blobs пересчитывается. Повторный запуск безопасен.
+# Исходные файлы здесь не удаляются (при откате транзакции проекты по-прежнему ссылаются на них):
+# возвращаются тройки (путь, размер, дубликат ли) для remove_replaced_uploads после фиксации
+def deduplicate_uploads(connection: Connection) -> list:
+    rows = connection.exec_driver_sql(
+        "SELECT id, file_path FROM projects WHERE file_path IS NOT NULL"
+    ).all()
+
+    blobs = {}
+    moved = {}
+    replaced = []
+
+    for project_id, path in rows:
+        if path in moved:
+            digest, size, target = moved[path]
+        elif os.path.isfile(path):
+            digest, size = hash_file(path)
+            target = blob_path(digest)
+            moved[path] = (digest, size, target)
+
+            if path != target:
+                duplicate = os.path.exists(target)
+                if not duplicate:
+                    _link_blob(path, target)
+                replaced.append((path, size, duplicate))
+        else:
+            continue
+
+        connection.exec_driver_sql(
+            "UPDATE projects SET file_path = ?, file_sha256 = ? WHERE id = ?",
+            (target, digest, project_id)
+        )
+        blobs.setdefault(digest, [target, size, 0])[2] += 1
+
+    connection.execute(delete(FileBlobModel))
+    if blobs:
+        connection.execute(
+            FileBlobModel.__table__.insert(),
+            [
+                {"sha256": digest, "path": path, "size": size, "ref_count": ref_count}
+                for digest, (path, size, ref_count) in blobs.items()
+            ]
+        )
+
+    logger.info("Дедупликация загрузок: файлов в хранилище %s, заменено файлов %s", len(blobs), len(replaced))
+    return replaced
+
+
+# Удаление исходных файлов, перенесённых в хранилище deduplicate_uploads (после фиксации транзакции).
+# Возвращает (число удалённых дубликатов, освобождённые байты)
+def remove_replaced_uploads(replaced: list) -> tuple:
+    removed_files = 0
+    saved_bytes = 0
+    for path, size, duplicate in replaced:
+        if duplicate and os.path.exists(path):
+            removed_files += 1
+            saved_bytes += size
+        remove_file(path)
+
+    logger.info("Дедупликация загрузок: удалено дубликатов %s, освобождено %s байт", removed_files, saved_bytes)
+    return removed_files, saved_bytes
+
+
+# Дедупликация для существующей базы: python -m app.project.storage
+async def deduplicate() -> None:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        replaced = await conn.run_sync(deduplicate_uploads)
+    removed_files, saved_bytes = remove_replaced_uploads(replaced)
+    await async_engine.dispose()
+    print(f"Удалено дубликатов: {removed_files}, освобождено байт: {saved_bytes}")
+
+
+if __name__ == "__main__":
+    asyncio.run(deduplicate())
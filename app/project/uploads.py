@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, delete
+from starlette.concurrency import run_in_threadpool
+
+from app.db.database import async_read_session
+from app.db.models import UploadSessionModel
+from app.db.write_queue import write_queue
+from app.project.storage import UPLOAD_DIR, remove_file
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Частичные файлы возобновляемых загрузок (в той же файловой системе, что и хранилище,
+# чтобы готовый файл переносился в него переименованием)
+SESSION_DIR = os.path.join(UPLOAD_DIR, "incomplete")
+os.makedirs(SESSION_DIR, exist_ok=True)
+
+# Сессии, в которые сейчас идёт запись (параллельная запись в одну сессию запрещена)
+_active_uploads: set = set()
+
+
+# Путь частичного файла сессии загрузки
+def session_part_path(upload_id: str) -> str:
+    return os.path.join(SESSION_DIR, f"{upload_id}.part")
+
+
+# Создание пустого частичного файла новой сессии
+def create_part_file(upload_id: str) -> None:
+    open(session_part_path(upload_id), "xb").close()
+
+
+# Текущее смещение сессии - размер частичного файла (None, если файла нет)
+def part_offset(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+
+# Дописывание фрагмента в частичный файл прямо из тела запроса, без накопления в памяти.
+# Если фрагмент выходит за объявленный размер файла, дописанные данные отбрасываются (413).
+# При обрыве соединения уже записанные байты сохраняются - клиент продолжит с нового смещения
+async def append_chunk(stream: AsyncIterator[bytes], upload_id: str, offset: int, file_size: int) -> int:
+    if upload_id in _active_uploads:
+        raise HTTPException(status_code=409, detail="В сессию уже идёт загрузка")
+    _active_uploads.add(upload_id)
+
+    try:
+        part = await run_in_threadpool(open, session_part_path(upload_id), "r+b")
+        try:
+            await run_in_threadpool(part.seek, offset)
+            written = offset
+
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if written + len(chunk) > file_size:
+                    await run_in_threadpool(part.truncate, offset)
+                    raise HTTPException(status_code=413, detail="Фрагмент выходит за размер файла")
+
+                await run_in_threadpool(part.write, chunk)
+                written += len(chunk)
+        finally:
+            await run_in_threadpool(part.close)
+    finally:
+        _active_uploads.discard(upload_id)
+
+    return written
+
+
+# Сборка брошенных сессий загрузки: сессия удаляется вместе с частичным файлом, если в неё
+# ничего не записывали дольше ttl_seconds. Запускается периодически в фоне
+class UploadSessionSweeper:
+    def __init__(self, interval_seconds: int, ttl_seconds: int):
+        self.interval_seconds = interval_seconds
+        self.ttl_seconds = ttl_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.sweeps = 0
+        self.removed_sessions = 0
+        self.removed_bytes = 0
+
+    # Запуск периодической сборки
+    def start(self) -> None:
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Ошибка сборки брошенных сессий загрузки")
+            await asyncio.sleep(self.interval_seconds)
+
+    # Однократная сборка; возвращает число удалённых сессий
+    async def sweep(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        async with async_read_session() as session:
+            candidates = (await session.execute(
+                select(UploadSessionModel.id).where(UploadSessionModel.created_at < cutoff)
+            )).scalars().all()
+
+        # Активность сессии определяется по времени последней записи в частичный файл
+        expired = await run_in_threadpool(self._expired_sessions, candidates)
+
+        if expired:
+            async def delete_sessions(session):
+                await session.execute(
+                    delete(UploadSessionModel).where(UploadSessionModel.id.in_(list(expired)))
+                )
+
+            await write_queue.submit(delete_sessions)
+
+        known = set(await self._known_session_ids())
+        orphaned = await run_in_threadpool(self._orphaned_parts, known)
+
+        removed_bytes = 0
+        for path, size in [*expired.values(), *orphaned]:
+            await run_in_threadpool(remove_file, path)
+            removed_bytes += size
+
+        self.sweeps += 1
+        self.removed_sessions += len(expired)
+        self.removed_bytes += removed_bytes
+        if expired or orphaned:
+            logger.info(
+                "Удалено сессий загрузки: %s, частичных файлов без сессии: %s, освобождено %s байт",
+                len(expired), len(orphaned), removed_bytes
+            )
+        return len(expired)
+
+    def _expired_sessions(self, upload_ids: list) -> dict:
+        threshold = time.time() - self.ttl_seconds
+        expired = {}
+        for upload_id in upload_ids:
+            if upload_id in _active_uploads:
+                continue
+            path = session_part_path(upload_id)
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                expired[upload_id] = (path, 0)
+                continue
+            if stat_result.st_mtime < threshold:
+                expired[upload_id] = (path, stat_result.st_size)
+        return expired
+
+    async def _known_session_ids(self) -> list:
+        async with async_read_session() as session:
+            return (await session.execute(select(UploadSessionModel.id))).scalars().all()
+
+    # Частичные файлы без сессии в базе (например, после сбоя), не изменявшиеся дольше ttl
+    def _orphaned_parts(self, known: set) -> list:
+        threshold = time.time() - self.ttl_seconds
+        orphaned = []
+        for entry in os.scandir(SESSION_DIR):
+            if not entry.name.endswith(".part") or entry.name[:-len(".part")] in known:
+                continue
+            stat_result = entry.stat()
+            if stat_result.st_mtime < threshold:
+                orphaned.append((entry.path, stat_result.st_size))
+        return orphaned
+
+    # Метрики сборки
+    def stats(self) -> dict:
+        return {
+            "active_uploads": len(_active_uploads),
+            "sweeps": self.sweeps,
+            "removed_sessions": self.removed_sessions,
+            "removed_bytes": self.removed_bytes
+        }
+
+
+upload_sweeper = UploadSessionSweeper(
+    interval_seconds=settings.UPLOAD_SESSION_SWEEP_INTERVAL_SECONDS,
+    ttl_seconds=settings.UPLOAD_SESSION_TTL_SECONDS
+)
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ProjectModel, ProjectVoteModel
+from app.db.write_queue import write_queue
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Текущий голос пользователя за проект по журналу (0, если голоса нет)
+async def current_vote(session: AsyncSession, project_id: int, user_id: int) -> int:
+    return await session.scalar(
+        select(ProjectVoteModel.vote).where(
+            ProjectVoteModel.project_id == project_id,
+            ProjectVoteModel.user_id == user_id
+        )
+    ) or 0
+
+
+# Применение голоса пользователя: запись в журнал project_votes и атомарное изменение счётчиков проекта.
+# Голос 0 отзывает предыдущий голос пользователя. Возвращает (rating, votes_count) или None, если проекта нет
+async def apply_vote(session: AsyncSession, project_id: int, user_id: int, vote: int) -> Optional[tuple]:
+    previous = await current_vote(session, project_id, user_id)
+
+    rating_delta = vote - previous
+    votes_delta = int(vote != 0) - int(previous != 0)
+
+    if vote == 0:
+        await session.execute(
+            delete(ProjectVoteModel).where(
+                ProjectVoteModel.project_id == project_id,
+                ProjectVoteModel.user_id == user_id
+            )
+        )
+    elif vote != previous:
+        await session.execute(
+            insert(ProjectVoteModel)
+            .values(project_id=project_id, user_id=user_id, vote=vote)
+            .on_conflict_do_update(
+                index_elements=[ProjectVoteModel.project_id, ProjectVoteModel.user_id],
+                set_={"vote": vote, "updated_at": func.now()}
+            )
+        )
+
+    # Повторный такой же голос ничего не меняет
+    if not rating_delta and not votes_delta:
+        result = await session.execute(
+            select(ProjectModel.rating, ProjectModel.votes_count).where(ProjectModel.id == project_id)
+        )
+        return result.one_or_none()
+
+    # Счётчики изменяются выражением на стороне сервера, а не перезаписью значений, прочитанных в Python
+    result = await session.execute(
+        update(ProjectModel)
+        .where(ProjectModel.id == project_id)
+        .values(
+            rating=func.coalesce(ProjectModel.rating, 0) + rating_delta,
+            votes_count=func.coalesce(ProjectModel.votes_count, 0) + votes_delta,
+            updated_at=datetime.utcnow()
+        )
+        .returning(ProjectModel.rating, ProjectModel.votes_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.one_or_none()
+
+
+# Удаление голосов за проект (при удалении самого проекта)
+async def delete_project_votes(session: AsyncSession, project_id: int) -> None:
+    await session.execute(delete(ProjectVoteModel).where(ProjectVoteModel.project_id == project_id))
+
+
+# Буфер отложенной записи голосов (write-behind) для проектов FEATURED.
+# Голоса накапливаются в памяти (последний голос пользователя побеждает) и сбрасываются
+# в базу одной транзакцией раз в flush_interval_ms или после flush_max_votes голосов
+class VoteBuffer:
+    def __init__(self, enabled: bool, flush_interval_ms: int, flush_max_votes: int):
+        self.enabled = enabled
+        self.flush_interval_ms = flush_interval_ms
+        self.flush_max_votes = flush_max_votes
+        # project_id -> user_id -> (голос, голос пользователя в базе на момент приёма)
+        self._pending: dict = {}
+        self._flushing: dict = {}
+        self._pending_count = 0
+        self._flush_lock = asyncio.Lock()
+        # Число начатых и завершённых сбросов (для проверки чтения из базы, см. read_marker)
+        self._flushes_started = 0
+        self._flushes_finished = 0
+        self._task: Optional[asyncio.Task] = None
+        self._flush_now = asyncio.Event()
+        self.accepted = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    # Запуск периодического сброса буфера
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    # Остановка с обязательным сбросом оставшихся голосов
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+
+    # Отметка перед чтением счётчиков и голоса из базы. Прочитанное согласовано с содержимым буфера,
+    # если с этой отметки до работы с буфером (без await между проверкой и add/merge) ни один сброс
+    # не начинался и не завершался: иначе запись сброса могла попасть в чтение, а голоса - остаться в буфере
+    # (или наоборот)
+    def read_marker(self) -> tuple:
+        return self._flushes_started, self._flushes_finished
+
+    def unchanged_since(self, marker: tuple) -> bool:
+        started, finished = marker
+        return started == finished == self._flushes_started == self._flushes_finished
+
+    # Ожидание завершения текущего сброса
+    async def wait_flush(self) -> None:
+        async with self._flush_lock:
+            pass
+
+    # Голос пользователя, ещё не записанный в базу (None, если такого нет)
+    def pending_vote(self, project_id: int, user_id: int) -> Optional[int]:
+        for votes in (self._pending, self._flushing):
+            entry = votes.get(project_id, {}).get(user_id)
+            if entry is not None:
+                return entry[0]
+        return None
+
+    # Приём голоса; previous - голос пользователя в базе (или ещё не записанный голос)
+    def add(self, project_id: int, user_id: int, vote: int, previous: int) -> None:
+        users = self._pending.setdefault(project_id, {})
+        if user_id in users:
+            previous = users[user_id][1]
+        else:
+            self._pending_count += 1
+        users[user_id] = (vote, previous)
+        self.accepted += 1
+
+        if self._pending_count >= self.flush_max_votes:
+            self._flush_now.set()
+
+    # Рейтинг и число голосов с учётом ещё не записанных голосов
+    def merge(self, project_id: int, rating: Optional[int], votes_count: Optional[int]) -> tuple:
+        rating = rating or 0
+        votes_count = votes_count or 0
+        for votes in (self._flushing, self._pending):
+            for vote, previous in votes.get(project_id, {}).values():
+                rating += vote - previous
+                votes_count += int(vote != 0) - int(previous != 0)
+        return rating, votes_count
+
+    # Запись накопленных голосов в базу одной транзакцией
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            self._flushing, self._pending = self._pending, {}
+            self._pending_count = 0
+            self._flushes_started += 1
+            batch = self._flushing
+
+            async def write_votes(session):
+                existing = set((await session.execute(
+                    select(ProjectModel.id).where(ProjectModel.id.in_(list(batch)))
+                )).scalars())
+                for project_id, users in batch.items():
+                    if project_id not in existing:
+                        continue
+                    for user_id, (vote, _) in users.items():
+                        await apply_vote(session, project_id, user_id, vote)
+
+            try:
+                await write_queue.submit(write_votes)
+            except Exception:
+                # Голоса возвращаются в буфер; более новые голоса пользователей имеют приоритет
+                logger.exception("Ошибка записи буфера голосов")
+                self.failed_flushes += 1
+                for project_id, users in batch.items():
+                    pending_users = self._pending.setdefault(project_id, {})
+                    for user_id, (vote, previous) in users.items():
+                        if user_id in pending_users:
+                            vote = pending_users[user_id][0]
+                        else:
+                            self._pending_count += 1
+                        pending_users[user_id] = (vote, previous)
+            else:
+                self.flushes += 1
+                self.flushed += sum(len(users) for users in batch.values())
+            finally:
+                self._flushing = {}
+                self._flushes_finished += 1
+
+    # Метрики буфера голосов
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending_votes": self._pending_count,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes
+        }
+
+
+vote_buffer = VoteBuffer(
+    enabled=settings.VOTE_WRITE_BEHIND,
+    flush_interval_ms=settings.VOTE_FLUSH_INTERVAL_MS,
+    flush_max_votes=settings.VOTE_FLUSH_MAX_VOTES
+)
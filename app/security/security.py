@@ -1,10 +1,16 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 
 import bcrypt
 import jwt
 from jwt import PyJWTError
 
+from app.cache.cache import TTLCache
 from config import settings
 
 # Объявление констант
@@ -12,6 +18,9 @@ SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Кэш расшифрованных токенов по SHA-256 от токена (запись живёт не дольше exp)
+token_cache = TTLCache(maxsize=settings.JWT_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
 # Функция хэширования пароля
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
@@ -24,6 +33,106 @@ def verify_password(plain_password: str, hashed: str) -> bool:
     )
 
 
+# Исключение при переполнении очереди хэширования паролей
+class HashingQueueFullError(Exception):
+    pass
+
+
+# Пул потоков для bcrypt (bcrypt отпускает GIL, поэтому потоков достаточно)
+class PasswordHasher:
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.reserved = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    # Освобождение места в очереди (задача выполнена или отменена до запуска)
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self.reserved -= 1
+
+    # Выполнение функции в пуле с учётом лимита очереди и замером задержек.
+    # Место освобождается по завершении future в пуле, поэтому отмена ожидающего запроса
+    # (разрыв соединения, таймаут) не оставляет занятых мест
+    async def _run(self, func: Callable, *args):
+        with self._lock:
+            if self.reserved >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HashingQueueFullError()
+            self.reserved += 1
+
+        submitted_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.in_flight += 1
+            try:
+                return func(*args)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.total_wait_seconds += started_at - submitted_at
+                    self.total_hash_seconds += finished_at - started_at
+                    self.max_hash_seconds = max(self.max_hash_seconds, finished_at - started_at)
+
+        try:
+            future = self._get_executor().submit(task)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    # Асинхронное хэширование пароля
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    # Асинхронная проверка пароля
+    async def verify(self, plain_password: str, hashed: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed)
+
+    # Остановка пула при завершении приложения
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # Метрики пула: глубина очереди и время хэширования
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "queue_depth": self.reserved - self.in_flight,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_hash_ms": round(self.total_hash_seconds / self.completed * 1000, 2) if self.completed else 0,
+            "max_hash_ms": round(self.max_hash_seconds * 1000, 2),
+            "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 2) if self.completed else 0
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT
+)
+
+
 # Создание JWT-токена с ролью
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -39,12 +148,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 # Верификации JWT-токена
 def verify_token(token: str):
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except PyJWTError as e:
         return None
 
+    # Токены без exp не кэшируются
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(cache_key, payload, ttl=exp - time.time())
+
+    return dict(payload)
+
+
 
 
 
@@ -1,14 +1,23 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.params import Query
 from sqlalchemy import select
 from starlette import status
 
 
-from app import SessionDep
+from app import SessionDep, ReadSessionDep
 from app.db.models import UserModel, UserRole
-from app.security.security import hash_password, verify_password, create_access_token
+from app.db.export import export_response
+from app.db.write_queue import write_queue
+from app.project.files import delete_user_projects, deletion_queue, orphan_sweeper
+from app.project.routers import project_count_cache
+from app.project.votes import vote_buffer
+from app.project.uploads import upload_sweeper
+from app.project.processing import processing_queue
+from app.lineevent.snapshot import timeline_store
+from app.security.security import password_hasher, token_cache, create_access_token
 from app.user.schema import UserAddSchema, UserLoginSchema, UserUpdateSchema
-from app.dependencies.dependencies import get_current_user, require_admin, require_admin_or_user
+from app.dependencies.dependencies import get_current_user, require_admin, require_admin_or_user, invalidate_user_cache, user_cache
 
 # Публичные роутеры (доступны всем)
 public_router = APIRouter(prefix="/user", tags=["Публичные методы"])
@@ -26,8 +35,8 @@ admin_router = APIRouter(prefix="/user/admin", tags=["Методы админи
 
 # Регистрация нового пользователя (по умолчанию роль USER)
 @public_router.post("/register", status_code=status.HTTP_201_CREATED)
-async def register(user: UserAddSchema, session: SessionDep):
-    existing_user = await session.execute(
+async def register(user: UserAddSchema, session: SessionDep, read_session: ReadSessionDep):
+    existing_user = await read_session.execute(
         select(UserModel).where(UserModel.email == user.email)
     )
     if existing_user.scalar_one_or_none():
@@ -36,7 +45,7 @@ async def register(user: UserAddSchema, session: SessionDep):
             detail="Пользователь с таким email уже существует"
         )
 
-    existing_phone = await session.execute(
+    existing_phone = await read_session.execute(
         select(UserModel).where(UserModel.phone_number == user.phone_number)
     )
     if existing_phone.scalar_one_or_none():
@@ -45,11 +54,14 @@ async def register(user: UserAddSchema, session: SessionDep):
             detail="Пользователь с таким номером телефона уже существует"
         )
 
+    # Соединение чтения не держится, пока пароль ждёт очереди хэширования
+    await read_session.close()
+
     # Создаем нового пользователя с ролью USER по умолчанию
     new_user = UserModel(
         name=user.name,
         email=user.email,
-        password=hash_password(user.password),
+        password=await password_hasher.hash(user.password),
         phone_number=user.phone_number,
         role=UserRole.USER
     )
@@ -67,12 +79,15 @@ async def register(user: UserAddSchema, session: SessionDep):
 
 # Вход в систему
 @public_router.post("/login")
-async def login(user: UserLoginSchema, session: SessionDep):
+async def login(user: UserLoginSchema, session: ReadSessionDep):
     stmt = select(UserModel).where(UserModel.email == user.email)
     result = await session.execute(stmt)
     db_user = result.scalar_one_or_none()
 
-    if not db_user or not verify_password(user.password, db_user.password):
+    # Соединение возвращается в пул до проверки пароля (загруженные атрибуты остаются у объекта)
+    await session.close()
+
+    if not db_user or not await password_hasher.verify(user.password, db_user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль"
@@ -127,6 +142,10 @@ async def update_profile(
 
 ):
 
+    # Хэширование выполняется до обращения к базе, чтобы не удерживать соединение писателя
+    if update_data.password is not None:
+        current_user.password = await password_hasher.hash(update_data.password)
+
     if update_data.name is not None:
         current_user.name = update_data.name
 
@@ -145,10 +164,8 @@ async def update_profile(
         current_user.phone_number = update_data.phone_number
 
 
-    if update_data.password is not None:
-        current_user.password = hash_password(update_data.password)
-
     await session.commit()
+    invalidate_user_cache(current_user.id)
     await session.refresh(current_user)
 
     return {
@@ -172,8 +189,12 @@ async def delete_profile(
 
 ):
 
+    paths = await delete_user_projects(session, current_user.id)
     await session.delete(current_user)
     await session.commit()
+    invalidate_user_cache(current_user.id)
+    project_count_cache.clear()
+    deletion_queue.schedule(paths)
 
     return {
         "status": "success",
@@ -186,18 +207,23 @@ async def delete_profile(
 # Получение всех пользователей
 @admin_router.get("/users")
 async def get_all_users(
-        session: SessionDep,
+        session: ReadSessionDep,
         current_user: UserModel = Depends(require_admin),
         skip: int = Query(0, ge=0),
         limit: int = Query(100, ge=1, le=1000)
 ):
     """Получение списка всех пользователей (только для администраторов)"""
-    stmt = select(UserModel).offset(skip).limit(limit)
+    # Core-запрос по колонкам без ORM-объектов (и без хэша пароля), ответ сериализуется orjson
+    stmt = select(
+        UserModel.id,
+        UserModel.name,
+        UserModel.email,
+        UserModel.phone_number,
+        UserModel.role
+    ).offset(skip).limit(limit)
     result = await session.execute(stmt)
-    users = result.scalars().all()
-
 
-    return [
+    return ORJSONResponse([
         {
             "id": user.id,
             "name": user.name,
@@ -205,14 +231,37 @@ async def get_all_users(
             "phone_number": user.phone_number,
             "role": user.role.value
         }
-        for user in users
-    ]
+        for user in result.all()
+    ])
+
+# Потоковая выгрузка всех пользователей в NDJSON (без хэшей паролей).
+# Объявлена до /users/{user_id}, иначе путь /users/export попадёт в него
+@admin_router.get("/users/export")
+async def export_users(
+        current_user: UserModel = Depends(require_admin),
+        after_id: int = Query(None, ge=0, description="Продолжить выгрузку после пользователя с этим id"),
+        gzip: bool = Query(False, description="Сжать выгрузку gzip")
+):
+    return export_response(
+        select(
+            UserModel.id,
+            UserModel.name,
+            UserModel.email,
+            UserModel.phone_number,
+            UserModel.role
+        ),
+        UserModel.id,
+        lambda user: {**user._asdict(), "role": user.role.value},
+        "users",
+        after_id,
+        gzip
+    )
 
 # Получение пользователя по id
 @admin_router.get("/users/{user_id}")
 async def get_user_by_id(
         user_id: int,
-        session: SessionDep,
+        session: ReadSessionDep,
         current_user: UserModel = Depends(require_admin)
 ):
     stmt = select(UserModel).where(UserModel.id == user_id)
@@ -262,6 +311,7 @@ async def change_user_role(
     # Изменяем роль
     user.role = new_role
     await session.commit()
+    invalidate_user_cache(user_id)
 
     return {
         "status": "success",
@@ -295,8 +345,12 @@ async def delete_user(
             detail=f"Пользователь с ID {user_id} не найден"
         )
 
+    paths = await delete_user_projects(session, user_id)
     await session.delete(user)
     await session.commit()
+    invalidate_user_cache(user_id)
+    project_count_cache.clear()
+    deletion_queue.schedule(paths)
 
     return {
         "status": "success",
@@ -307,7 +361,7 @@ async def delete_user(
 # Получение статистики
 @admin_router.get("/statistics")
 async def get_statistics(
-        session: SessionDep,
+        session: ReadSessionDep,
         current_user: UserModel = Depends(require_admin)
 ):
 
@@ -329,4 +383,21 @@ async def get_statistics(
         "admins": admin_count,
         "users": user_count,
         "admin_percentage": round((admin_count / total_users * 100), 2) if total_users > 0 else 0
-    }
\ No newline at end of file
+    }
+
+
+# Метрики внутренних кэшей процесса
+@admin_router.get("/metrics")
+async def get_metrics(current_user: UserModel = Depends(require_admin)):
+    return {
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "write_queue": write_queue.stats(),
+        "vote_buffer": vote_buffer.stats(),
+        "upload_sweeper": upload_sweeper.stats(),
+        "processing_queue": processing_queue.stats(),
+        "deletion_queue": deletion_queue.stats(),
+        "orphan_sweeper": orphan_sweeper.stats(),
+        "timeline_snapshot": timeline_store.stats()
+    }
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Класс Settings (извлечение переменных окружения из .env файла)
@@ -7,7 +9,86 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Профиль базы данных: "development" (по умолчанию) или "production"
+    DB_PROFILE: Literal["development", "production"] = "development"
+    # Журнал SQL; по умолчанию включён в профиле development и выключен в production
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: int = 5
+    DB_WRITE_POOL_SIZE: int = 1
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    # Пересоздание и проверка соединений пула (только для серверных СУБД, не для файла SQLite)
+    DB_POOL_RECYCLE: int = 3600
+
+    # PRAGMA для SQLite в профиле production
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_MMAP_SIZE: int = 268435456
+    DB_CACHE_SIZE_KB: int = 65536
+    DB_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
+    # Очередь записи с единственным писателем (0 мс - групповая фиксация отключена)
+    WRITE_QUEUE_MAX_SIZE: int = 1000
+    WRITE_QUEUE_GROUP_COMMIT_MS: int = 0
+    WRITE_QUEUE_MAX_BATCH: int = 32
+
+    # Кэш аутентифицированных пользователей (get_current_user)
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    # Кэш проверенных JWT-токенов (verify_token)
+    JWT_CACHE_SIZE: int = 4096
+
+    # Загрузка файлов проектов
+    UPLOAD_MAX_SIZE_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # Текстовые поля формы загрузки (multipart): размер одного поля и число полей
+    UPLOAD_FORM_FIELD_MAX_BYTES: int = 64 * 1024
+    UPLOAD_FORM_MAX_FIELDS: int = 20
+    # Возобновляемые загрузки: время жизни сессии без активности и период сборки брошенных сессий
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+    UPLOAD_SESSION_SWEEP_INTERVAL_SECONDS: int = 600
+
+    # Отложенное удаление файлов (размер пачки и период) и поиск неиспользуемых файлов в uploads/projects
+    FILE_DELETE_BATCH_SIZE: int = 100
+    FILE_DELETE_INTERVAL_MS: int = 500
+    ORPHAN_SWEEP_INTERVAL_SECONDS: int = 3600
+    ORPHAN_GRACE_SECONDS: int = 3600
+
+    # Снимок ленты времени в памяти: возраст, после которого он перечитывается из базы в фоне
+    # (нужно при нескольких процессах приложения; 0 - только перестроение после изменений в этом процессе)
+    TIMELINE_SNAPSHOT_MAX_AGE_SECONDS: int = 60
+
+    # Массовый импорт NDJSON/CSV: строк в одной пачке записи, ошибок в отчёте и максимальная длина строки
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+    IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # Потоковая выгрузка NDJSON: строк в одной пачке серверного курсора и уровень сжатия gzip
+    EXPORT_CHUNK_ROWS: int = 1000
+    EXPORT_GZIP_LEVEL: int = 6
+
+    # Фоновая обработка загруженных файлов: число процессов, попытки, время, после которого
+    # задача в статусе RUNNING считается брошенной (например, после перезапуска), и интервал опроса
+    PROCESSING_WORKERS: int = 2
+    PROCESSING_MAX_ATTEMPTS: int = 3
+    PROCESSING_JOB_TIMEOUT_SECONDS: int = 300
+    # Предельное время обработки одного файла (меньше PROCESSING_JOB_TIMEOUT_SECONDS)
+    PROCESSING_TASK_TIMEOUT_SECONDS: int = 120
+    PROCESSING_POLL_INTERVAL_SECONDS: int = 5
+    PROCESSING_TEXT_EXCERPT_CHARS: int = 2000
+
+    # Отложенная запись голосов за проекты FEATURED (write-behind)
+    VOTE_WRITE_BEHIND: bool = False
+    VOTE_FLUSH_INTERVAL_MS: int = 200
+    VOTE_FLUSH_MAX_VOTES: int = 500
+
+    # Кэш общего количества проектов в GET /projects/ (по набору фильтров)
+    PROJECT_COUNT_CACHE_SIZE: int = 256
+    PROJECT_COUNT_CACHE_TTL_SECONDS: int = 5
 
+    # Пул потоков для хэширования паролей (bcrypt)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 64
 
     model_config = SettingsConfigDict(env_file='.env')
 
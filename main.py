@@ -1,9 +1,17 @@
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 
 from app.db.database import create_db
+from app.db.write_queue import write_queue, WriteQueueFullError
+from app.project.votes import vote_buffer
+from app.project.uploads import upload_sweeper
+from app.project.processing import processing_queue
+from app.project.files import deletion_queue, orphan_sweeper
+from app.lineevent.snapshot import timeline_store
+from app.security.security import password_hasher, HashingQueueFullError
 from app.user.routers import admin_router, user_router, public_router
 from app.lineevent.routers import router as line_event_router
 from app.hero.routers import router as hero_router
@@ -32,10 +40,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Быстрый отказ при переполнении очередей хэширования паролей и записи в базу
+@app.exception_handler(HashingQueueFullError)
+@app.exception_handler(WriteQueueFullError)
+async def overloaded_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Сервис перегружен, повторите попытку позже"},
+        headers={"Retry-After": "1"}
+    )
+
 # Функции, вызываемые при запуске проекта (создание бд)
 @app.on_event("startup")
 async def startup():
     await create_db()
+    await timeline_store.load()
+    write_queue.start()
+    vote_buffer.start()
+    upload_sweeper.start()
+    processing_queue.start()
+    deletion_queue.start()
+    orphan_sweeper.start()
+
+# Функции, вызываемые при остановке проекта
+@app.on_event("shutdown")
+async def shutdown():
+    await processing_queue.stop()
+    await upload_sweeper.stop()
+    await orphan_sweeper.stop()
+    await deletion_queue.stop()
+    await vote_buffer.stop()
+    await write_queue.stop()
+    password_hasher.shutdown()
 
 
 # функция запуска API
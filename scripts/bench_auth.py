@@ -0,0 +1,56 @@
+import asyncio
+
+import bench_common
+
+# Замер стоимости аутентификации запроса: проверка JWT с кэшем проверенных токенов и без него.
+# Запуск: python scripts/bench_auth.py
+
+REQUESTS = 2000
+
+
+async def main():
+    await bench_common.start_app()
+
+    import jwt
+    from app.security.security import verify_token, token_cache, SECRET_KEY, ALGORITHM
+    from config import settings
+
+    _, headers = await bench_common.create_user("bench@example.com")
+    token = headers["Authorization"].split(" ", 1)[1]
+
+    def decode_only():
+        for _ in range(REQUESTS):
+            jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    def verify_uncached():
+        for _ in range(REQUESTS):
+            token_cache.clear()
+            verify_token(token)
+
+    def verify_cached():
+        for _ in range(REQUESTS):
+            verify_token(token)
+
+    print(f"verify_token, мкс на вызов ({REQUESTS} вызовов):")
+    print(f"  jwt.decode:     {bench_common.median_ms(decode_only, repeat=5) * 1000 / REQUESTS:8.2f}")
+    print(f"  без кэша:       {bench_common.median_ms(verify_uncached, repeat=5) * 1000 / REQUESTS:8.2f}")
+    print(f"  с кэшем:        {bench_common.median_ms(verify_cached, repeat=5) * 1000 / REQUESTS:8.2f}")
+
+    async def profile_requests():
+        for _ in range(100):
+            status, _ = await bench_common.call("GET", "/user/profile", headers=headers)
+            assert status == 200, status
+
+    print("GET /user/profile, мс на запрос (100 запросов):")
+    token_cache.maxsize = 0
+    token_cache.clear()
+    print(f"  без кэша токенов: {await bench_common.median_ms_async(profile_requests, repeat=5) / 100:6.3f}")
+    token_cache.maxsize = settings.JWT_CACHE_SIZE
+    print(f"  с кэшем токенов:  {await bench_common.median_ms_async(profile_requests, repeat=5) / 100:6.3f}")
+    print(f"  {token_cache.stats()}")
+
+    await bench_common.stop_app()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+import asyncio
+import atexit
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Optional
+
+# Общие функции для скриптов замеров (scripts/bench_*.py). Каждый замер работает с временной базой
+# и временным каталогом uploads (другую базу можно задать в BENCH_DB_URL); остальные переменные
+# окружения можно переопределить при запуске, например:
+#   DB_PROFILE=production python scripts/bench_db_profile.py
+# Импортировать до модулей приложения: настройки читаются при импорте config
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="orbit-bench-")
+atexit.register(shutil.rmtree, WORK_DIR, True)
+
+os.environ["DB_URL"] = os.environ.get("BENCH_DB_URL", f"sqlite+aiosqlite:///{WORK_DIR}/bench.sqlite3")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-bench-secret-key")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+# Журнал SQL профиля development искажает замеры; в профиле production он выключен по умолчанию
+if os.environ.get("DB_PROFILE", "development") != "production":
+    os.environ.setdefault("DB_ECHO", "false")
+
+sys.path.insert(0, ROOT_DIR)
+os.chdir(WORK_DIR)
+logging.disable(logging.WARNING)
+
+
+# Запуск обработчиков startup приложения (миграции, фоновые задачи)
+async def start_app():
+    import main
+    for handler in main.app.router.on_startup:
+        await handler()
+    return main.app
+
+
+async def stop_app() -> None:
+    import main
+    for handler in main.app.router.on_shutdown:
+        await handler()
+
+
+# Вызов эндпоинта напрямую через ASGI (без сети и без клиентских библиотек).
+# Возвращает код ответа и тело; тело запроса можно передать частями (body_chunks)
+async def call(
+        method: str,
+        path: str,
+        query: str = "",
+        headers: Optional[dict] = None,
+        body: bytes = b"",
+        body_chunks: Optional[list] = None
+) -> tuple:
+    import main
+
+    chunks = body_chunks if body_chunks is not None else [body]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    }
+    position = 0
+    status = None
+    response = bytearray()
+
+    async def receive():
+        nonlocal position
+        if position < len(chunks):
+            position += 1
+            return {"type": "http.request", "body": chunks[position - 1], "more_body": position < len(chunks)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            response.extend(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status, bytes(response)
+
+
+# Вставка тестовых данных через очередь записи (фоновые задачи приложения не получают "database is locked").
+# Возвращает lastrowid последней вставки
+async def insert_rows(statement: str, rows: list) -> int:
+    from app.db.write_queue import write_queue
+
+    async def unit(session):
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(statement, rows if len(rows) > 1 else rows[0])
+        return result.lastrowid
+
+    return await write_queue.submit(unit)
+
+
+# Пользователь напрямую в базе (без bcrypt) и заголовок авторизации для него
+async def create_user(email: str, role: str = "USER") -> tuple:
+    from app.security.security import create_access_token
+
+    user_id = await insert_rows(
+        "INSERT INTO users (name, email, phone_number, password, role) VALUES (?, ?, ?, ?, ?)",
+        [("bench", email, str(abs(hash(email)) % 10 ** 10), "-", role)]
+    )
+    token = create_access_token({"sub": email, "user_id": user_id, "name": "bench", "role": role})
+    return user_id, {"Authorization": f"Bearer {token}"}
+
+
+# Медиана времени выполнения (в миллисекундах) синхронной функции после прогрева
+def median_ms(func: Callable, repeat: int = 20, warmup: int = 3) -> float:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples) * 1000
+
+
+# То же для корутины
+async def median_ms_async(func: Callable, repeat: int = 20, warmup: int = 3) -> float:
+    for _ in range(warmup):
+        await func()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples) * 1000
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import bench_common
+
+# Замер пропускной способности смешанной нагрузки (75% чтений, 25% записей) в профилях базы
+# development и production. Каждый профиль запускается в отдельном процессе с новой базой
+# (режим WAL сохраняется в файле базы). Запуск: python scripts/bench_db_profile.py
+
+ROUNDS = 40
+CONCURRENCY = 50
+PROFILES = ("development", "production")
+
+
+async def run_workload():
+    await bench_common.start_app()
+
+    from sqlalchemy import select
+    from app.db.database import async_read_session
+    from app.db.models import TimelineEventModel
+    from app.db.write_queue import write_queue
+
+    async def write(i):
+        async def unit(session):
+            session.add(TimelineEventModel(year=1900 + i % 100, title=f"Событие {i}", description="Описание " * 20))
+        await write_queue.submit(unit)
+
+    async def read(i):
+        async with async_read_session() as session:
+            result = await session.execute(
+                select(TimelineEventModel).where(TimelineEventModel.year >= 1900 + i % 100).limit(50)
+            )
+            result.scalars().all()
+
+    completed = 0
+    errors = 0
+
+    async def operation(i):
+        nonlocal completed, errors
+        try:
+            await (write(i) if i % 4 == 0 else read(i))
+            completed += 1
+        except Exception:
+            errors += 1
+
+    started_at = time.perf_counter()
+    for round_no in range(ROUNDS):
+        await asyncio.gather(*[operation(round_no * CONCURRENCY + i) for i in range(CONCURRENCY)])
+    elapsed = time.perf_counter() - started_at
+
+    from config import settings
+    from app.db.database import async_engine
+    print(f"{settings.DB_PROFILE:12} {completed / elapsed:8.0f} оп/с  ошибок: {errors}  "
+          f"({completed} операций за {elapsed:.2f} с, echo={async_engine.echo})")
+
+    await bench_common.stop_app()
+
+
+def main():
+    print(f"{ROUNDS} раундов по {CONCURRENCY} параллельных операций "
+          f"(development с DB_ECHO=false, production - с журналом SQL по умолчанию профиля)")
+    for profile in PROFILES:
+        env = {**os.environ, "DB_PROFILE": profile}
+        # DB_ECHO=false задан bench_common для development; production проверяется со своим значением
+        if profile == "production":
+            env.pop("DB_ECHO", None)
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--run"], env=env, check=True)
+
+
+if __name__ == "__main__":
+    if "--run" in sys.argv:
+        asyncio.run(run_workload())
+    else:
+        main()
@@ -0,0 +1,76 @@
+import asyncio
+import sys
+import time
+
+import orjson
+
+import bench_common
+
+# Скорость загрузки событий ленты времени: поштучно через POST /lineevent/createLineEvent
+# и потоковым импортом NDJSON/CSV через POST /lineevent/importLineEvents (а также героев).
+# Запуск: python scripts/bench_import.py [число строк импорта, по умолчанию 50000]
+
+SINGLE_EVENTS = 300
+CHUNK_BYTES = 64 * 1024
+
+
+def chunks(body: bytes) -> list:
+    return [body[i:i + CHUNK_BYTES] for i in range(0, len(body), CHUNK_BYTES)]
+
+
+async def import_rate(path: str, query: str, headers: dict, content_type: str, body: bytes) -> dict:
+    started_at = time.perf_counter()
+    status, response = await bench_common.call(
+        "POST", path, query, {**headers, "Content-Type": content_type}, body_chunks=chunks(body)
+    )
+    elapsed = time.perf_counter() - started_at
+    assert status == 200, response
+    report = orjson.loads(response)
+    assert report["failed"] == 0, report["errors"][:5]
+    report["wall_rows_per_second"] = round(report["imported"] / elapsed)
+    return report
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    await bench_common.start_app()
+
+    _, headers = await bench_common.create_user("admin@example.com", role="ADMIN")
+
+    started_at = time.perf_counter()
+    for i in range(SINGLE_EVENTS):
+        status, body = await bench_common.call(
+            "POST", "/lineevent/createLineEvent", "", {**headers, "Content-Type": "application/json"},
+            orjson.dumps({"year": 1900 + i % 100, "title": f"Событие {i}", "description": "Описание события " * 10})
+        )
+        assert status in (200, 201), body
+    single_rate = SINGLE_EVENTS / (time.perf_counter() - started_at)
+
+    ndjson = b"\n".join(
+        orjson.dumps({"year": 1000 + i % 1000, "title": f"Событие {i}", "description": "Описание события " * 10})
+        for i in range(rows)
+    ) + b"\n"
+    csv = ("year,title,description\n" + "".join(
+        f"{1000 + i % 1000},Событие {i},\"Описание события, часть {i}\"\n" for i in range(rows)
+    )).encode()
+    heroes = b"\n".join(
+        orjson.dumps({"name": f"Герой {i}", "role": "Космонавт", "description": "Биография " * 10,
+                      "tags": ["космос", "полёт"]})
+        for i in range(rows // 5)
+    ) + b"\n"
+
+    print(f"Поштучно ({SINGLE_EVENTS} событий):  {single_rate:8.0f} строк/с")
+    for title, path, content_type, body in [
+        (f"Импорт NDJSON ({rows} событий)", "/lineevent/importLineEvents", "application/x-ndjson", ndjson),
+        (f"Импорт CSV ({rows} событий)", "/lineevent/importLineEvents", "text/csv", csv),
+        (f"Импорт NDJSON ({rows // 5} героев)", "/hero/importHeroes", "application/x-ndjson", heroes)
+    ]:
+        report = await import_rate(path, "", headers, content_type, body)
+        print(f"{title:34} {report['rows_per_second']:8} строк/с (с учётом ответа: "
+              f"{report['wall_rows_per_second']}), {report['duration_ms']:.0f} мс")
+
+    await bench_common.stop_app()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import orjson
+
+import bench_common
+
+# Замер задержки 1000-й страницы списка проектов при пагинации по смещению (offset) и по курсору.
+# Запуск: python scripts/bench_pagination.py
+
+PROJECTS = 100000
+PAGE_SIZE = 20
+PAGE = 1000
+
+
+async def main():
+    await bench_common.start_app()
+
+    user_id, headers = await bench_common.create_user("owner@example.com")
+    random.seed(1)
+    started = datetime(2024, 1, 1)
+    rows = [
+        (user_id if i % 2 else user_id + 1, "owner", "owner@example.com", "0", f"Проект {i}", "Описание проекта " * 20,
+         random.choice(("idea", "drawing")), random.choice(("PENDING", "APPROVED", "FEATURED", "REJECTED")),
+         (started + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f"))
+        for i in range(PROJECTS)
+    ]
+    await bench_common.insert_rows(
+        "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+        "project_type, status, created_at, rating, votes_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)",
+        rows
+    )
+
+    print(f"{PROJECTS} проектов, страница {PAGE} по {PAGE_SIZE} элементов, медиана, мс")
+    for title, path, params, auth in [
+        ("GET /projects/", "/projects/", "include_total=false", None),
+        ("GET /projects/?status=APPROVED", "/projects/", "include_total=false&status=APPROVED", None),
+        ("GET /projects/my/projects", "/projects/my/projects", "", headers)
+    ]:
+        prefix = f"{params}&" if params else ""
+        offset = (PAGE - 1) * PAGE_SIZE
+
+        # Курсор 1000-й страницы - next_cursor предыдущей страницы (у /my/projects нет offset,
+        # поэтому курсор получается обходом страницами по 1000)
+        if path == "/projects/":
+            status, body = await bench_common.call(
+                "GET", path, f"{prefix}limit={PAGE_SIZE}&offset={offset - PAGE_SIZE}", auth
+            )
+            assert status == 200, body
+            cursor = orjson.loads(body)["next_cursor"]
+        else:
+            cursor = None
+            for start in range(0, offset, 1000):
+                query = f"limit={min(1000, offset - start)}" + (f"&cursor={cursor}" if cursor else "")
+                status, body = await bench_common.call("GET", path, query, auth)
+                assert status == 200, body
+                cursor = orjson.loads(body)["next_cursor"]
+
+        async def offset_page():
+            status, body = await bench_common.call("GET", path, f"{prefix}limit={PAGE_SIZE}&offset={offset}", auth)
+            assert status == 200, body
+
+        async def cursor_page():
+            status, body = await bench_common.call("GET", path, f"{prefix}limit={PAGE_SIZE}&cursor={cursor}", auth)
+            assert status == 200, body
+
+        if path == "/projects/":
+            print(f"  {title:32} offset {await bench_common.median_ms_async(offset_page):7.2f}   "
+                  f"cursor {await bench_common.median_ms_async(cursor_page):7.2f}")
+        else:
+            # У /my/projects нет offset: до курсоров эндпоинт возвращал весь список
+            async def full_list():
+                status, body = await bench_common.call("GET", path, "", auth)
+                assert status == 200, body
+
+            print(f"  {title:32} весь список {await bench_common.median_ms_async(full_list, repeat=5):7.2f}   "
+                  f"cursor {await bench_common.median_ms_async(cursor_page):7.2f}")
+
+    await bench_common.stop_app()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import asyncio
+import random
+
+import bench_common
+
+# Сравнение поиска проектов по индексу FTS5 (bm25, префиксы) с прежним ILIKE '%term%'
+# по title и description на 100 тысячах проектов: страница из 100 результатов и общее количество.
+# Запуск: python scripts/bench_search.py
+
+PROJECTS = 100000
+PAGE_SIZE = 100
+WORDS = (
+    "ракета спутник орбита станция двигатель топливо модуль посадка луна марс телескоп антенна "
+    "солнечная батарея корабль экипаж стыковка траектория разгон ступень носитель аэростат планер "
+    "крыло фюзеляж шасси турбина пропеллер навигация связь датчик радиатор обтекатель парашют"
+).split()
+TERMS = ("ракета", "двигат", "парашют стыковка", "ионный")
+
+
+async def main():
+    await bench_common.start_app()
+
+    from sqlalchemy import select, func, or_
+    from app.db.database import async_read_session
+    from app.db.models import ProjectModel
+    from app.project.routers import PROJECT_RESPONSE_COLUMNS
+    from app.project.search import build_fts_query, project_search_subquery
+
+    user_id, _ = await bench_common.create_user("owner@example.com")
+    random.seed(1)
+    rows = [
+        (user_id, "owner", "owner@example.com", "0",
+         " ".join(random.choices(WORDS, k=3)).capitalize(),
+         " ".join(random.choices(WORDS, k=60)) + (" ионный" if i % 1000 == 0 else ""))
+        for i in range(PROJECTS)
+    ]
+    await bench_common.insert_rows(
+        "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+        "project_type, status, created_at, rating, votes_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, 'idea', 'APPROVED', CURRENT_TIMESTAMP, 0, 0)",
+        rows
+    )
+
+    async with async_read_session() as session:
+        async def ilike(term):
+            # Прежний фильтр: вся строка поиска как подстрока названия или описания
+            condition = or_(ProjectModel.title.ilike(f"%{term}%"), ProjectModel.description.ilike(f"%{term}%"))
+            total = await session.scalar(select(func.count()).select_from(ProjectModel).where(condition))
+            page = (await session.execute(
+                select(*PROJECT_RESPONSE_COLUMNS).where(condition)
+                .order_by(ProjectModel.created_at.desc(), ProjectModel.id.desc()).limit(PAGE_SIZE)
+            )).all()
+            return total, len(page)
+
+        async def fts(term):
+            search_index = project_search_subquery(build_fts_query(term))
+            total = await session.scalar(
+                select(func.count()).select_from(ProjectModel)
+                .join(search_index, search_index.c.project_id == ProjectModel.id)
+            )
+            page = (await session.execute(
+                select(*PROJECT_RESPONSE_COLUMNS)
+                .join(search_index, search_index.c.project_id == ProjectModel.id)
+                .order_by(search_index.c.rank, ProjectModel.id.desc()).limit(PAGE_SIZE)
+            )).all()
+            return total, len(page)
+
+        print(f"{PROJECTS} проектов, страница {PAGE_SIZE} + общее количество, медиана, мс")
+        for term in TERMS:
+            ilike_found, _ = await ilike(term)
+            fts_found, _ = await fts(term)
+            ilike_ms = await bench_common.median_ms_async(lambda: ilike(term), repeat=5, warmup=1)
+            fts_ms = await bench_common.median_ms_async(lambda: fts(term), repeat=5, warmup=1)
+            print(f"  {term!r:20} ILIKE {ilike_ms:8.1f} ({ilike_found:6} найдено)   "
+                  f"FTS5 {fts_ms:8.1f} ({fts_found:6} найдено)")
+
+    await bench_common.stop_app()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import asyncio
+
+import bench_common
+
+# Стоимость выборки и сериализации одного элемента списка при limit=1000: прежний путь
+# (ORM-объекты, словари в Python, jsonable_encoder и JSONResponse) и быстрый путь
+# (колонки Core-запросом, ORJSONResponse; лента времени - готовые байты снимка).
+# Запуск: python scripts/bench_serialization.py
+
+ITEMS = 1000
+
+
+async def serialize_after(fetch, serialize):
+    return serialize(await fetch())
+
+
+async def main():
+    await bench_common.start_app()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from sqlalchemy import select
+    from app.db.database import async_read_session
+    from app.db.models import ProjectModel, UserModel, TimelineEventModel
+    from app.lineevent.snapshot import timeline_store
+    from app.project.routers import PROJECT_RESPONSE_COLUMNS, project_to_response, project_row_to_response
+
+    user_id, admin_headers = await bench_common.create_user("admin@example.com", role="ADMIN")
+    await bench_common.insert_rows(
+        "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+        "project_type, status, created_at, rating, votes_count) "
+        "VALUES (?, 'owner', 'owner@example.com', '0', ?, ?, 'idea', 'APPROVED', CURRENT_TIMESTAMP, 0, 0)",
+        [(user_id, f"Проект {i}", "Описание проекта " * 30) for i in range(ITEMS)]
+    )
+    await bench_common.insert_rows(
+        "INSERT INTO users (name, email, phone_number, password, role) VALUES (?, ?, ?, ?, 'USER')",
+        [(f"user{i}", f"user{i}@example.com", f"{i:010d}", "$2b$12$" + "x" * 53) for i in range(ITEMS)]
+    )
+    await bench_common.insert_rows(
+        "INSERT INTO timeline_events (year, title, description) VALUES (?, ?, ?)",
+        [(1900 + i % 120, f"Событие {i}", "Описание события " * 20) for i in range(ITEMS)]
+    )
+    await timeline_store.rebuild()
+
+    def user_to_response(user):
+        return {"id": user.id, "name": user.name, "email": user.email,
+                "phone_number": user.phone_number, "role": user.role.value}
+
+    async with async_read_session() as session:
+        async def fetch_orm(model):
+            session.expunge_all()
+            return (await session.execute(select(model).limit(ITEMS))).scalars().all()
+
+        async def fetch_core(*columns):
+            return (await session.execute(select(*columns).limit(ITEMS))).all()
+
+        user_columns = (UserModel.id, UserModel.name, UserModel.email, UserModel.phone_number, UserModel.role)
+        cases = [
+            (
+                "projects",
+                lambda: fetch_orm(ProjectModel),
+                lambda items: JSONResponse(jsonable_encoder([project_to_response(p) for p in items])).body,
+                lambda: fetch_core(*PROJECT_RESPONSE_COLUMNS),
+                lambda rows: ORJSONResponse([project_row_to_response(r) for r in rows]).body
+            ),
+            (
+                "users",
+                lambda: fetch_orm(UserModel),
+                lambda items: JSONResponse(jsonable_encoder([user_to_response(u) for u in items])).body,
+                lambda: fetch_core(*user_columns),
+                lambda rows: ORJSONResponse([user_to_response(r) for r in rows]).body
+            ),
+            (
+                "timeline",
+                lambda: fetch_orm(TimelineEventModel),
+                lambda items: JSONResponse(jsonable_encoder(items)).body,
+                timeline_store.get,
+                lambda snapshot: snapshot.select_body(None, None, "desc", 0, ITEMS)
+            )
+        ]
+
+        print(f"мкс на элемент при limit={ITEMS}: выборка + сериализация (только сериализация)")
+        for name, old_fetch, old_serialize, new_fetch, new_serialize in cases:
+            old_items = await old_fetch()
+            new_items = await new_fetch()
+            old_total = await bench_common.median_ms_async(lambda: serialize_after(old_fetch, old_serialize))
+            new_total = await bench_common.median_ms_async(lambda: serialize_after(new_fetch, new_serialize))
+            old_only = bench_common.median_ms(lambda: old_serialize(old_items))
+            new_only = bench_common.median_ms(lambda: new_serialize(new_items))
+            print(f"  {name:9} прежний путь {old_total * 1000 / ITEMS:7.2f} ({old_only * 1000 / ITEMS:6.2f})   "
+                  f"быстрый путь {new_total * 1000 / ITEMS:7.2f} ({new_only * 1000 / ITEMS:6.2f})")
+
+    print(f"Эндпоинты целиком, мс на запрос из {ITEMS} элементов:")
+    for title, path, headers in [
+        ("GET /projects/", "/projects/", None),
+        ("GET /user/admin/users", "/user/admin/users", admin_headers),
+        ("GET /lineevent/getAllLineEvents", "/lineevent/getAllLineEvents", None)
+    ]:
+        async def request():
+            status, body = await bench_common.call("GET", path, f"limit={ITEMS}", headers)
+            assert status == 200, body
+        print(f"  {title:32} {await bench_common.median_ms_async(request):7.2f}")
+
+    await bench_common.stop_app()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Тесты работают с временной базой SQLite и временным каталогом uploads.
+# Переменные окружения задаются до импорта config (настройки читаются при импорте)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="orbit-tests-")
+
+os.environ["DB_URL"] = f"sqlite+aiosqlite:///{WORK_DIR}/test.sqlite3"
+os.environ["JWT_SECRET_KEY"] = "test-secret-key-test-secret-key!"
+os.environ["JWT_ALGORITHM"] = "HS256"
+os.environ["JWT_ACCESS_TOKEN_EXPIRE_MINUTES"] = "60"
+os.environ["DB_ECHO"] = "false"
+
+sys.path.insert(0, ROOT_DIR)
+os.chdir(WORK_DIR)
+
+
+# Цикл событий на всю сессию тестов: движки и фоновые задачи приложения привязаны к нему
+@pytest.fixture(scope="session")
+def run():
+    import main
+
+    loop = asyncio.new_event_loop()
+    for handler in main.app.router.on_startup:
+        loop.run_until_complete(handler())
+
+    yield loop.run_until_complete
+
+    for handler in main.app.router.on_shutdown:
+        loop.run_until_complete(handler())
+    loop.close()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+# Вызов эндпоинта напрямую через ASGI; возвращает код ответа и тело
+@pytest.fixture(scope="session")
+def call(run):
+    import main
+
+    async def request(method: str, path: str, query: str = "", headers: dict = None, body=b""):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "server": ("test", 80),
+            "client": ("test", 1),
+            "headers": [(b"host", b"test")] + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        }
+        # Тело - байты или итератор фрагментов (фрагменты передаются по одному по мере чтения)
+        chunks = iter([body]) if isinstance(body, bytes) else iter(body)
+        next_chunk = next(chunks, b"")
+        sent = False
+        response = {"status": None, "body": bytearray()}
+
+        async def receive():
+            nonlocal sent, next_chunk
+            if not sent:
+                chunk, next_chunk = next_chunk, next(chunks, None)
+                sent = next_chunk is None
+                return {"type": "http.request", "body": chunk, "more_body": not sent}
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].extend(message.get("body", b""))
+
+        await main.app(scope, receive, send)
+        return response["status"], bytes(response["body"])
+
+    return request
+
+
+# Пользователь напрямую в базе (без bcrypt); возвращает id и заголовок авторизации
+@pytest.fixture(scope="session")
+def create_user(run):
+    counter = 0
+
+    async def create(role: str = "USER"):
+        nonlocal counter
+        from app.db.database import async_engine
+        from app.security.security import create_access_token
+
+        counter += 1
+        email = f"user{counter}@example.com"
+        async with async_engine.begin() as conn:
+            result = await conn.exec_driver_sql(
+                "INSERT INTO users (name, email, phone_number, password, role) VALUES (?, ?, ?, ?, ?)",
+                (f"user{counter}", email, f"{counter:010d}", "-", role)
+            )
+            user_id = result.lastrowid
+        token = create_access_token({"sub": email, "user_id": user_id, "name": f"user{counter}", "role": role})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return create
@@ -0,0 +1,33 @@
+# Параметры движка по профилю базы: в production журнал SQL выключен по умолчанию,
+# а проверка и пересоздание соединений пула включаются только для серверных СУБД
+
+
+def test_production_profile_options(monkeypatch):
+    from app.db.database import engine_options
+    from config import settings
+
+    monkeypatch.setattr(settings, "DB_PROFILE", "production")
+    monkeypatch.setattr(settings, "DB_ECHO", None)
+    monkeypatch.setattr(settings, "DB_URL", "sqlite+aiosqlite:///orbit.sqlite3")
+
+    options = engine_options()
+    assert options["echo"] is False
+    assert "pool_pre_ping" not in options and "pool_recycle" not in options
+
+    monkeypatch.setattr(settings, "DB_URL", "postgresql+asyncpg://orbit@db/orbit")
+    options = engine_options(read_only=True)
+    assert options["pool_pre_ping"] is True
+    assert options["pool_recycle"] == settings.DB_POOL_RECYCLE
+
+
+def test_echo_defaults_by_profile(monkeypatch):
+    from app.db.database import engine_options
+    from config import settings
+
+    monkeypatch.setattr(settings, "DB_ECHO", None)
+    monkeypatch.setattr(settings, "DB_PROFILE", "development")
+    assert engine_options()["echo"] is True
+
+    monkeypatch.setattr(settings, "DB_PROFILE", "production")
+    monkeypatch.setattr(settings, "DB_ECHO", True)
+    assert engine_options()["echo"] is True
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event
+
+# Проверка планов запросов списка проектов: каждый SELECT по projects, который выполняют
+# эндпоинты, должен идти по составному индексу ix_projects_* без полного просмотра таблицы
+# и без временного B-дерева для сортировки
+
+
+@pytest.fixture(scope="module")
+def owner(run, create_user):
+    from app.db.database import async_engine
+
+    user_id, headers = run(create_user())
+
+    async def seed():
+        async with async_engine.begin() as conn:
+            await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, created_at, rating, votes_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)",
+                [
+                    (user_id, "owner", "owner@example.com", "0", f"Проект {i}", "Описание",
+                     ("idea", "drawing")[i % 2], ("PENDING", "APPROVED", "FEATURED")[i % 3],
+                     f"2026-01-01 00:00:{i % 60:02d}.{i:06d}")
+                    for i in range(50)
+                ]
+            )
+
+    run(seed())
+    return user_id, headers
+
+
+# SELECT-запросы к projects, выполненные при вызове эндпоинта
+def captured_selects(run, call, path: str, query: str, headers: dict = None) -> list:
+    from app.db.database import async_read_engine
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM projects" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(async_read_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        status, body = run(call("GET", path, query, headers))
+    finally:
+        event.remove(async_read_engine.sync_engine, "before_cursor_execute", capture)
+
+    assert status == 200, body
+    assert statements, f"{path}?{query}: запросов к projects не выполнено"
+    return statements
+
+
+def query_plan(run, statement: str, parameters) -> str:
+    from app.db.database import async_read_engine
+
+    async def explain():
+        async with async_read_engine.connect() as conn:
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return "\n".join(row[3] for row in result.all())
+
+    return run(explain())
+
+
+# Просмотр projects допустим только по индексу (упорядоченный обход с LIMIT), не по самой таблице
+def assert_uses_project_index(plan: str) -> None:
+    assert "ix_projects_" in plan, plan
+    for line in plan.splitlines():
+        if line.startswith("SCAN projects"):
+            assert "INDEX ix_projects_" in line, plan
+    assert "USE TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("query", [
+    "include_total=false",
+    "include_total=false&limit=20&offset=20",
+    "include_total=false&status=APPROVED",
+    "include_total=false&status=APPROVED&project_type=idea",
+    "include_total=false&project_type=drawing"
+])
+def test_project_list_uses_indexes(run, call, owner, query):
+    for statement, parameters in captured_selects(run, call, "/projects/", query):
+        assert_uses_project_index(query_plan(run, statement, parameters))
+
+
+def test_project_list_count_uses_index(run, call, owner):
+    statements = captured_selects(run, call, "/projects/", "status=APPROVED&project_type=idea")
+    counts = [(s, p) for s, p in statements if "count(" in s.lower()]
+    assert counts
+    for statement, parameters in counts:
+        plan = query_plan(run, statement, parameters)
+        assert "ix_projects_" in plan, plan
+
+
+@pytest.mark.parametrize("query", ["", "limit=20"])
+def test_my_projects_uses_user_index(run, call, owner, query):
+    _, headers = owner
+    for statement, parameters in captured_selects(run, call, "/projects/my/projects", query, headers):
+        plan = query_plan(run, statement, parameters)
+        assert "ix_projects_user_created" in plan, plan
+        assert_uses_project_index(plan)
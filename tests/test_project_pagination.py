@@ -0,0 +1,65 @@
+import orjson
+
+# Keyset-пагинация списков проектов по next_cursor: проекты, созданные в одну секунду
+# со значением created_at по умолчанию, проходятся ровно один раз
+
+PROJECTS = 7
+PAGE_SIZE = 2
+
+
+def seed(run, user_id: int, status: str) -> list:
+    from app.db.database import async_engine
+
+    async def insert():
+        async with async_engine.begin() as conn:
+            await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, rating, votes_count) "
+                "VALUES (?, 'owner', 'owner@example.com', '0', ?, 'Описание', 'idea', ?, 0, 0)",
+                [(user_id, f"Проект {i}", status) for i in range(PROJECTS)]
+            )
+            # Явный CURRENT_TIMESTAMP (как значение по умолчанию в базе до миграции 10) без долей секунды
+            await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, created_at, rating, votes_count) "
+                "VALUES (?, 'owner', 'owner@example.com', '0', 'Проект', 'Описание', 'idea', ?, "
+                "CURRENT_TIMESTAMP, 0, 0)",
+                (user_id, status)
+            )
+            return (await conn.exec_driver_sql(
+                "SELECT id FROM projects WHERE user_id = ? ORDER BY created_at DESC, id DESC", (user_id,)
+            )).scalars().all()
+
+    return run(insert())
+
+
+def walk(run, call, path: str, query: str, headers: dict = None) -> list:
+    pages = []
+    cursor = None
+    for _ in range(PROJECTS + 2):
+        page_query = f"{query}&limit={PAGE_SIZE}" + (f"&cursor={cursor}" if cursor else "")
+        status, body = run(call("GET", path, page_query, headers))
+        assert status == 200, body
+        result = orjson.loads(body)
+        pages.append([project["id"] for project in result["projects"]])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    return pages
+
+
+def test_my_projects_cursor_walks_each_project_once(run, call, create_user):
+    user_id, headers = run(create_user())
+    ids = seed(run, user_id, "PENDING")
+
+    pages = walk(run, call, "/projects/my/projects", "", headers)
+    assert [project_id for page in pages for project_id in page] == ids
+    assert all(len(page) <= PAGE_SIZE for page in pages)
+
+
+def test_projects_cursor_walks_each_project_once(run, call, create_user):
+    user_id, _ = run(create_user())
+    ids = seed(run, user_id, "ARCHIVED")
+
+    pages = walk(run, call, "/projects/", "status=ARCHIVED")
+    assert [project_id for page in pages for project_id in page] == ids
@@ -0,0 +1,97 @@
+import os
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+
+# Фоновая обработка файлов: зависшая обработка прерывается по таймауту, а брошенная задача
+# с исчерпанными попытками больше не забирается повторно
+
+Job = namedtuple("Job", "id attempts project_id file_path file_name file_sha256")
+
+
+async def create_job(status: str, attempts: int, started_at: datetime, project_id: int = 0) -> int:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        result = await conn.exec_driver_sql(
+            "INSERT INTO processing_jobs (project_id, status, attempts, created_at, started_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (project_id, status, attempts, started_at, started_at)
+        )
+        return result.lastrowid
+
+
+async def job_state(job_id: int) -> tuple:
+    from app.db.database import async_engine
+
+    async with async_engine.connect() as conn:
+        return tuple((await conn.exec_driver_sql(
+            "SELECT status, attempts, error FROM processing_jobs WHERE id = ?", (job_id,)
+        )).one())
+
+
+def test_hanging_file_times_out(run, tmp_path):
+    from app.project.processing import ProcessingQueue
+
+    # Чтение из FIFO без писателя блокирует процесс обработки навсегда
+    path = str(tmp_path / "hanging.fifo")
+    os.mkfifo(path)
+    queue = ProcessingQueue(workers=1, max_attempts=3, job_timeout_seconds=300, task_timeout_seconds=1,
+                            poll_interval_seconds=60, excerpt_chars=100)
+    # Задача без проекта и уже в статусе RUNNING: фоновая очередь приложения её не тронет до таймаута
+    job_id = run(create_job("RUNNING", 1, datetime.utcnow()))
+
+    try:
+        run(queue._process(Job(job_id, 1, 0, path, "hanging.bin", "0" * 64)))
+        status, attempts, error = run(job_state(job_id))
+        assert (status, attempts) == ("PENDING", 1)
+        assert "не завершилась" in error
+        assert queue.timed_out == 1
+        assert queue._executor is None
+    finally:
+        run(queue.stop())
+
+
+@pytest.fixture
+def paused_processing(run):
+    from app.project.processing import processing_queue
+
+    async def start():
+        processing_queue.start()
+
+    # Фоновая очередь приложения не должна забрать задачи теста раньше него
+    run(processing_queue.stop())
+    yield
+    run(start())
+
+
+def test_stale_job_with_exhausted_attempts_fails(run, create_user, paused_processing):
+    from app.db.database import async_engine
+    from app.db.write_queue import write_queue
+    from app.project.processing import ProcessingQueue
+
+    user_id, _ = run(create_user())
+
+    async def create_project() -> int:
+        async with async_engine.begin() as conn:
+            result = await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, rating, votes_count, file_path) "
+                "VALUES (?, 'owner', 'owner@example.com', '0', 'Проект', 'Описание', 'idea', 'PENDING', 0, 0, ?)",
+                (user_id, "uploads/projects/missing.bin")
+            )
+            return result.lastrowid
+
+    queue = ProcessingQueue(workers=1, max_attempts=3, job_timeout_seconds=300, task_timeout_seconds=120,
+                            poll_interval_seconds=60, excerpt_chars=100)
+    project_id = run(create_project())
+    started_at = datetime.utcnow() - timedelta(seconds=600)
+    exhausted_id = run(create_job("RUNNING", 3, started_at, project_id))
+    retried_id = run(create_job("RUNNING", 1, started_at, project_id))
+
+    claimed = run(write_queue.submit(lambda session: queue._claim(session, 10)))
+    ours = [(job.id, job.attempts) for job in claimed if job.id in (exhausted_id, retried_id)]
+    assert ours == [(retried_id, 2)]
+    assert run(job_state(exhausted_id))[0] == "FAILED"
+    assert queue.failed == 1
@@ -0,0 +1,51 @@
+import orjson
+import pytest
+
+# Поиск проектов через индекс FTS5
+
+
+@pytest.fixture(scope="module")
+def projects(run, create_user):
+    from app.db.database import async_engine
+
+    user_id, _ = run(create_user())
+
+    async def seed():
+        async with async_engine.begin() as conn:
+            await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, created_at, rating, votes_count) "
+                "VALUES (?, 'owner', 'owner@example.com', '0', ?, ?, 'idea', 'APPROVED', CURRENT_TIMESTAMP, 0, 0)",
+                [
+                    (user_id, "Ракета-носитель", "Многоступенчатая ракета для вывода спутников"),
+                    (user_id, "Орбитальная станция", "Модуль для длительных полётов")
+                ]
+            )
+
+    run(seed())
+
+
+def search(run, call, text: str) -> dict:
+    from urllib.parse import urlencode
+
+    status, body = run(call("GET", "/projects/", urlencode({"search": text})))
+    assert status == 200, body
+    return orjson.loads(body)
+
+
+def test_search_by_prefix(run, call, projects):
+    result = search(run, call, "ракет")
+    assert [p["title"] for p in result["projects"]] == ["Ракета-носитель"]
+    assert result["total"] == 1
+
+
+@pytest.mark.parametrize("text", ["!!!", "?", "- + *", '"'])
+def test_search_without_words_finds_nothing(run, call, projects, text):
+    result = search(run, call, text)
+    assert result["projects"] == []
+    assert result["total"] == 0
+    assert result["next_cursor"] is None
+
+
+def test_blank_search_is_ignored(run, call, projects):
+    assert search(run, call, "   ")["total"] >= 2
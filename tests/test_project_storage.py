@@ -0,0 +1,210 @@
+import hashlib
+import os
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+# Хранилище файлов проектов: файл попадает в uploads/projects только после фиксации транзакции
+
+BOUNDARY = "test-boundary"
+
+
+def multipart(fields: dict, filename: str, content: bytes) -> bytes:
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def upload(run, call, headers: dict, content: bytes) -> tuple:
+    body = multipart({"title": "Проект", "project_type": "idea"}, "plan.txt", content)
+    return run(call(
+        "POST", "/projects/upload", "",
+        {**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        body
+    ))
+
+
+def blob_rows(run, digest: str) -> list:
+    from app.db.database import async_engine
+
+    async def select():
+        async with async_engine.connect() as conn:
+            return (await conn.exec_driver_sql(
+                "SELECT path, ref_count FROM file_blobs WHERE sha256 = ?", (digest,)
+            )).all()
+
+    return run(select())
+
+
+def part_files() -> list:
+    from app.project.storage import UPLOAD_DIR
+
+    return [name for name in os.listdir(UPLOAD_DIR) if name.endswith(".part")]
+
+
+@pytest.fixture
+def failing_write(monkeypatch):
+    import app.project.routers as routers
+
+    def fail(session, project_id):
+        raise HTTPException(status_code=507, detail="Ошибка записи")
+
+    monkeypatch.setattr(routers, "enqueue_processing", fail)
+
+
+def test_upload_places_blob_after_commit(run, call, create_user):
+    from app.project.storage import blob_path
+
+    _, headers = run(create_user())
+    content = b"blob after commit"
+    digest = hashlib.sha256(content).hexdigest()
+
+    for _ in range(2):
+        status, body = upload(run, call, headers, content)
+        assert status == 200, body
+        assert orjson.loads(body)["project"]["file_path"] == blob_path(digest)
+
+    assert blob_rows(run, digest) == [(blob_path(digest), 2)]
+    assert os.path.isfile(blob_path(digest))
+    assert part_files() == []
+
+
+def test_upload_over_limit_is_rejected_while_streaming(run, call, create_user, monkeypatch):
+    from config import settings
+
+    monkeypatch.setattr(settings, "UPLOAD_MAX_SIZE_BYTES", 4096)
+    _, headers = run(create_user())
+    body = multipart({"title": "Проект", "project_type": "idea"}, "big.bin", b"x" * 64 * 1024)
+    chunks = iter([body[i:i + 1024] for i in range(0, len(body), 1024)])
+
+    status, _ = run(call(
+        "POST", "/projects/upload", "",
+        {**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        chunks
+    ))
+    assert status == 413
+    # Чтение тела остановлено вскоре после превышения лимита
+    assert len(list(chunks)) > 50
+    assert part_files() == []
+
+
+def test_upload_without_required_fields(run, call, create_user):
+    _, headers = run(create_user())
+    body = multipart({"title": "Проект"}, "plan.txt", b"no project type")
+
+    status, body = run(call(
+        "POST", "/projects/upload", "",
+        {**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        body
+    ))
+    assert status == 422, body
+    assert part_files() == []
+
+
+def test_failed_write_leaves_no_blob(run, call, create_user, failing_write):
+    from app.project.storage import blob_path
+
+    _, headers = run(create_user())
+    content = b"rolled back upload"
+    digest = hashlib.sha256(content).hexdigest()
+
+    status, _ = upload(run, call, headers, content)
+    assert status == 507
+
+    assert blob_rows(run, digest) == []
+    assert not os.path.exists(blob_path(digest))
+    assert part_files() == []
+
+
+def test_deleted_project_file_is_removed(run, call, create_user):
+    from app.project.files import deletion_queue, TRASH_DIR
+    from app.project.storage import blob_path
+
+    _, headers = run(create_user())
+    content = b"deleted with the project"
+    digest = hashlib.sha256(content).hexdigest()
+
+    project_ids = []
+    for _ in range(2):
+        status, body = upload(run, call, headers, content)
+        assert status == 200, body
+        project_ids.append(orjson.loads(body)["project_id"])
+
+    # Файл остаётся, пока на него ссылается второй проект
+    assert run(call("DELETE", f"/projects/{project_ids[0]}", "", headers))[0] == 200
+    run(deletion_queue.drain())
+    assert os.path.isfile(blob_path(digest))
+
+    assert run(call("DELETE", f"/projects/{project_ids[1]}", "", headers))[0] == 200
+    run(deletion_queue.drain())
+    assert blob_rows(run, digest) == []
+    assert not os.path.exists(blob_path(digest))
+    assert os.listdir(TRASH_DIR) == []
+
+
+def test_failed_migration_keeps_deduplicated_uploads(run, tmp_path):
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.db.database import create_db, disable_driver_transactions, begin_immediate
+    from app.db.models import Base
+    from app.project.storage import UPLOAD_DIR, blob_path
+
+    content = b"legacy upload before deduplication"
+    digest = hashlib.sha256(content).hexdigest()
+    originals = [os.path.join(UPLOAD_DIR, f"legacy-{i}.txt") for i in range(2)]
+    for path in originals:
+        with open(path, "wb") as f:
+            f.write(content)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.sqlite3")
+    event.listen(engine.sync_engine, "connect", disable_driver_transactions)
+    event.listen(engine.sync_engine, "begin", begin_immediate)
+
+    # База до миграций: пути загрузок без хранилища и год события, который миграция 7 не преобразует
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.exec_driver_sql("DROP TABLE timeline_events")
+            await conn.exec_driver_sql(
+                "CREATE TABLE timeline_events (id INTEGER NOT NULL PRIMARY KEY, year VARCHAR(10) NOT NULL, "
+                "title VARCHAR(200) NOT NULL, description TEXT NOT NULL)"
+            )
+            await conn.exec_driver_sql(
+                "INSERT INTO timeline_events (year, title, description) VALUES ('1957 г.', 'Спутник', 'Запуск')"
+            )
+            await conn.exec_driver_sql(
+                "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+                "project_type, status, created_at, rating, votes_count, file_path) "
+                "VALUES (1, 'owner', 'owner@example.com', '0', 'Проект', 'Описание', 'idea', 'APPROVED', "
+                "CURRENT_TIMESTAMP, 0, 0, ?)",
+                [(path,) for path in originals]
+            )
+
+    async def state():
+        async with engine.connect() as conn:
+            version = (await conn.exec_driver_sql("PRAGMA user_version")).scalar()
+            paths = (await conn.exec_driver_sql("SELECT file_path FROM projects")).scalars().all()
+        return version, paths
+
+    run(seed())
+    try:
+        with pytest.raises(RuntimeError):
+            run(create_db(engine))
+
+        version, paths = run(state())
+        assert version == 6
+        assert paths == [blob_path(digest)] * 2
+        assert os.path.isfile(blob_path(digest))
+        assert not any(os.path.exists(path) for path in originals)
+    finally:
+        run(engine.dispose())
+        for path in originals + [blob_path(digest)]:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,129 @@
+import asyncio
+import random
+
+import orjson
+import pytest
+
+# Параллельные голоса многих пользователей за один проект: голоса разных пользователей идут одновременно,
+# голоса одного пользователя - по порядку. После записи всех голосов (и сброса буфера отложенной записи)
+# счётчики проекта и журнал project_votes должны совпадать с последними голосами пользователей
+
+USERS = 100
+VOTES_PER_USER = 20
+
+
+async def create_project(status: str, owner_id: int) -> int:
+    from app.db.database import async_engine
+
+    async with async_engine.begin() as conn:
+        result = await conn.exec_driver_sql(
+            "INSERT INTO projects (user_id, user_name, user_email, user_phone, title, description, "
+            "project_type, status, created_at, rating, votes_count) "
+            "VALUES (?, 'owner', 'owner@example.com', '0', 'Проект', 'Описание', 'idea', ?, CURRENT_TIMESTAMP, 0, 0)",
+            (owner_id, status)
+        )
+        return result.lastrowid
+
+
+async def counters(project_id: int) -> tuple:
+    from app.db.database import async_engine
+
+    async with async_engine.connect() as conn:
+        stored = (await conn.exec_driver_sql(
+            "SELECT rating, votes_count FROM projects WHERE id = ?", (project_id,)
+        )).one()
+        journal = (await conn.exec_driver_sql(
+            "SELECT COALESCE(SUM(vote), 0), COUNT(*) FROM project_votes WHERE project_id = ?", (project_id,)
+        )).one()
+    return tuple(stored), tuple(journal)
+
+
+@pytest.fixture
+def write_behind(run, monkeypatch):
+    from app.project.votes import vote_buffer
+
+    async def start():
+        vote_buffer.start()
+
+    # Маленький порог сброса: записи буфера идут вперемешку с приёмом новых голосов
+    monkeypatch.setattr(vote_buffer, "enabled", True)
+    monkeypatch.setattr(vote_buffer, "flush_max_votes", 5)
+    run(start())
+    yield vote_buffer
+    run(vote_buffer.stop())
+
+
+# Возвращает id проекта и ожидаемые (rating, votes_count) по последним голосам пользователей
+def stress_votes(run, call, create_user, status: str) -> tuple:
+    owner_id, _ = run(create_user())
+    voters = [run(create_user())[1] for _ in range(USERS)]
+    project_id = run(create_project(status, owner_id))
+
+    rng = random.Random(status)
+    votes = [[rng.choice((-1, 0, 1)) for _ in range(VOTES_PER_USER)] for _ in voters]
+
+    async def vote_in_order(headers, values):
+        for value in values:
+            # Уступаем очередь, чтобы голоса пользователей перемежались
+            await asyncio.sleep(0)
+            status_code, body = await call("POST", f"/projects/{project_id}/vote", f"vote={value}", headers)
+            assert status_code == 200, body
+
+    async def vote_all():
+        await asyncio.gather(*(vote_in_order(headers, values) for headers, values in zip(voters, votes)))
+
+    run(vote_all())
+    last_votes = [values[-1] for values in votes]
+    return project_id, (sum(last_votes), sum(1 for value in last_votes if value))
+
+
+def test_parallel_votes_keep_counters_consistent(run, call, create_user):
+    project_id, expected = stress_votes(run, call, create_user, "APPROVED")
+
+    stored, journal = run(counters(project_id))
+    assert stored == expected
+    assert journal == expected
+
+
+def test_parallel_buffered_votes_keep_counters_consistent(run, call, create_user, write_behind):
+    project_id, expected = stress_votes(run, call, create_user, "FEATURED")
+    assert write_behind.accepted == USERS * VOTES_PER_USER
+    assert write_behind.flushes > 0
+
+    run(write_behind.flush())
+
+    stored, journal = run(counters(project_id))
+    assert stored == expected
+    assert journal == expected
+    assert write_behind.merge(project_id, *stored) == expected
+
+
+def test_buffered_vote_during_flush(run, call, create_user, write_behind, monkeypatch):
+    import app.project.routers as routers
+
+    owner_id, _ = run(create_user())
+    _, first = run(create_user())
+    _, second = run(create_user())
+    project_id = run(create_project("FEATURED", owner_id))
+
+    assert run(call("POST", f"/projects/{project_id}/vote", "vote=1", first))[0] == 200
+
+    # Буфер сбрасывается, когда второй голос уже прочитал проект, но ещё не учтён
+    read_vote = routers.current_vote
+    flushed = False
+
+    async def flush_then_read(session, *args):
+        nonlocal flushed
+        if not flushed:
+            flushed = True
+            await write_behind.flush()
+        return await read_vote(session, *args)
+
+    monkeypatch.setattr(routers, "current_vote", flush_then_read)
+    status, body = run(call("POST", f"/projects/{project_id}/vote", "vote=1", second))
+    assert status == 200, body
+    assert flushed
+    assert (orjson.loads(body)["rating"], orjson.loads(body)["votes_count"]) == (2, 2)
+
+    run(write_behind.flush())
+    assert run(counters(project_id)) == ((2, 2), (2, 2))
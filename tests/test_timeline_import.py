@@ -0,0 +1,60 @@
+import orjson
+
+# Массовый импорт событий ленты времени: индексы поиска обновляются пачкой, без построчных триггеров,
+# а после импорта триггеры снова индексируют отдельные события
+
+
+def import_events(run, call, headers: dict, events: list, batch_size: int) -> dict:
+    body = b"".join(orjson.dumps(event) + b"\n" for event in events)
+    status, response = run(call(
+        "POST", "/lineevent/importLineEvents", f"batch_size={batch_size}",
+        {**headers, "Content-Type": "application/x-ndjson"}, body
+    ))
+    assert status == 200, response
+    return orjson.loads(response)
+
+
+def search(run, call, headers: dict, text: str) -> list:
+    from urllib.parse import urlencode
+
+    status, body = run(call("GET", "/lineevent/searchEvents", urlencode({"q": text}), headers))
+    assert status == 200, body
+    return [event["title"] for event in orjson.loads(body)]
+
+
+def index_triggers(run) -> list:
+    from app.db.database import async_engine
+
+    async def select():
+        async with async_engine.connect() as conn:
+            return [row[0] for row in await conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'timeline_%_ai' ORDER BY name"
+            )]
+
+    return run(select())
+
+
+def test_imported_events_are_searchable(run, call, create_user):
+    _, headers = run(create_user("ADMIN"))
+    events = [
+        {"year": 1957, "title": f"Запуск спутника {i}", "description": "Первый искусственный спутник Земли"}
+        for i in range(5)
+    ]
+    # Строка, не прошедшая проверку схемы, не попадает в пачку и не сдвигает индексируемый диапазон id
+    events.insert(2, {"year": 1961, "title": "Полёт Гагарина", "description": None})
+    events.append({"year": 1969, "title": "Высадка на Луну", "description": "Экипаж Аполлона-11"})
+
+    report = import_events(run, call, headers, events, batch_size=3)
+    assert (report["imported"], report["failed"]) == (6, 1)
+
+    assert len(search(run, call, headers, "спутник")) == 5
+    assert search(run, call, headers, "аполлон") == ["Высадка на Луну"]
+    assert search(run, call, headers, "Апполона") == ["Высадка на Луну"]
+    assert index_triggers(run) == ["timeline_fts_ai", "timeline_trigram_ai"]
+
+    status, body = run(call(
+        "POST", "/lineevent/createLineEvent", "", {**headers, "Content-Type": "application/json"},
+        orjson.dumps({"year": 1965, "title": "Выход в открытый космос", "description": "Леонов"})
+    ))
+    assert status in (200, 201), body
+    assert search(run, call, headers, "Леонов") == ["Выход в открытый космос"]